@@ -0,0 +1,292 @@
+import os
+import queue
+from collections import deque
+import threading
+import time
+
+from segment_store import WriterLock, compressed_path
+
+# ---------------- CAPTURE ENGINE ----------------
+# Shared by every capture path: a reader thread pumps raw bytes from the
+# device pipe in large chunks, only cutting them on the last newline, and a
+# writer worker drains a bounded queue with large buffered writes. Writers
+# can share a WriterPool; each writer is pinned to one worker so its
+# batches stay in order. Optional stages (logcat_columns.ColumnStage,
+# live_matcher.MatchStage) see every byte written to each segment on the
+# worker thread.
+
+READ_CHUNK_SIZE = 256 * 1024
+WRITE_BUFFER_SIZE = 1024 * 1024
+QUEUE_MAX_BATCHES = 256
+MAX_COALESCED_BATCHES = 64
+FLUSH_INTERVAL = 0.5
+DEFAULT_WRITER_WORKERS = 4
+LATENCY_SAMPLES = 4096
+
+
+class LineCounter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._value = 0
+
+    def add(self, n):
+        with self._lock:
+            self._value += n
+
+    @property
+    def value(self):
+        return self._value
+
+
+class LatencyRecorder:
+    # Submit-to-written time of the most recent batches.
+    def __init__(self, size=LATENCY_SAMPLES):
+        self._samples = deque(maxlen=size)
+
+    def record(self, seconds):
+        self._samples.append(seconds)
+
+    def percentiles(self, points=(50, 95, 99)):
+        samples = sorted(self._samples)
+        if not samples:
+            return {f"p{p}": None for p in points}
+        return {f"p{p}": round(samples[min(len(samples) - 1, len(samples) * p // 100)] * 1000, 3)
+                for p in points}
+
+
+class _WriterWorker:
+    def __init__(self, queue_size, exit_when_idle=False, latency=None):
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.writers = set()
+        self.exit_when_idle = exit_when_idle
+        self.latency = latency if latency is not None else LatencyRecorder()
+        self._last_flush = 0.0
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def _loop(self):
+        while True:
+            try:
+                item = self.queue.get(timeout=FLUSH_INTERVAL)
+            except queue.Empty:
+                self._flush_all()
+                continue
+            items = [item]
+            while len(items) < MAX_COALESCED_BATCHES:
+                try:
+                    items.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            # Group consecutive batches per writer into one write; a None batch
+            # closes that writer once everything queued before it is written.
+            pending = {}
+            for writer, data, submitted in items:
+                if data is not None:
+                    pending.setdefault(writer, []).append((data, submitted))
+                    continue
+                self._write(writer, pending.pop(writer, None))
+                writer._finish()
+                self.writers.discard(writer)
+            for writer, batches in pending.items():
+                self._write(writer, batches)
+
+            if time.monotonic() - self._last_flush >= FLUSH_INTERVAL:
+                self._flush_all()
+            if self.exit_when_idle and not self.writers:
+                return
+
+    def _write(self, writer, batches):
+        if not batches:
+            return
+        if writer.error is not None:
+            writer.dropped_lines += sum(data.count(b"\n") for data, _ in batches)
+            return
+        try:
+            writer._write(batches[0][0] if len(batches) == 1 else b"".join(data for data, _ in batches))
+        except Exception as e:
+            print(f"[Capture] Writer failed for {writer.log_file_base}: {e}")
+            writer.error = e
+            return
+        now = time.monotonic()
+        for _, submitted in batches:
+            self.latency.record(now - submitted)
+
+    def _flush_all(self):
+        for writer in list(self.writers):
+            writer._flush()
+        self._last_flush = time.monotonic()
+
+
+class WriterPool:
+    def __init__(self, workers=DEFAULT_WRITER_WORKERS, queue_size=QUEUE_MAX_BATCHES):
+        self.latency = LatencyRecorder()
+        self._workers = [_WriterWorker(queue_size, latency=self.latency) for _ in range(workers)]
+        self._lock = threading.Lock()
+
+    def attach(self, writer):
+        with self._lock:
+            worker = min(self._workers, key=lambda w: len(w.writers))
+            worker.writers.add(writer)
+            return worker
+
+    @property
+    def queue_depth(self):
+        return sum(w.queue.qsize() for w in self._workers)
+
+
+class CaptureWriter:
+    def __init__(self, log_file_base, max_size, counter=None, queue_size=QUEUE_MAX_BATCHES,
+                 on_segment_closed=None, pool=None, stages=()):
+        self.log_file_base = log_file_base
+        self.max_size = max_size
+        self.counter = counter if counter is not None else LineCounter()
+        self.on_segment_closed = on_segment_closed
+        self.pool = pool
+        self.stages = list(stages)
+        self.queue_size = queue_size
+        self.file_index = 1
+        self.bytes_in_segment = 0
+        self.bytes_written = 0
+        self.dropped_lines = 0
+        self.error = None
+        self._file = None
+        self._lock = None
+        self._worker = None
+        self._closed = threading.Event()
+
+    def segment_path(self, index):
+        return f"{self.log_file_base}_{index}.txt"
+
+    def start(self):
+        # Taken before any segment is opened, so a sweep in another process
+        # never compresses a segment this writer may still append to.
+        self._lock = WriterLock(os.path.dirname(self.log_file_base))
+        # Never append to an earlier segment: it may already be indexed or
+        # queued for compression.
+        while os.path.exists(self.segment_path(self.file_index)) or \
+                os.path.exists(compressed_path(self.segment_path(self.file_index))):
+            self.file_index += 1
+        self._open_segment()
+        if self.pool is not None:
+            self._worker = self.pool.attach(self)
+        else:
+            # Without a shared pool the writer gets a worker thread of its own.
+            self._worker = _WriterWorker(self.queue_size, exit_when_idle=True)
+            self._worker.writers.add(self)
+        return self
+
+    def submit(self, data, lines):
+        if self.error is not None:
+            raise self.error
+        if not data:
+            return
+        # Blocks when the writer falls behind so the backlog stays bounded.
+        self._worker.queue.put((self, data, time.monotonic()))
+        self.counter.add(lines)
+
+    def pump(self, stream, keep_running=lambda: True):
+        read = getattr(stream, "read1", stream.read)
+        tail = b""
+        while keep_running():
+            chunk = read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            cut = chunk.rfind(b"\n") + 1
+            if cut == 0:
+                tail += chunk
+                continue
+            if cut == len(chunk):
+                batch = tail + chunk if tail else chunk
+                tail = b""
+            else:
+                batch = tail + chunk[:cut]
+                tail = chunk[cut:]
+            self.submit(batch, batch.count(b"\n"))
+        if tail:
+            self.submit(tail, 1)
+
+    @property
+    def latency(self):
+        return self._worker.latency if self._worker is not None else None
+
+    def close(self):
+        if self._worker is None:
+            return
+        self._worker.queue.put((self, None, None))
+        self._closed.wait()
+        self._worker = None
+
+    # ---------------- WORKER SIDE ----------------
+    def _write(self, data):
+        view = memoryview(data)
+        pos, end = 0, len(data)
+        while self.bytes_in_segment + (end - pos) > self.max_size:
+            room = self.max_size - self.bytes_in_segment
+            cut = data.rfind(b"\n", pos, pos + room) + 1
+            if cut == 0:
+                if self.bytes_in_segment:
+                    self._rotate()
+                    continue
+                # A single line longer than a whole segment gets a segment of its own.
+                cut = data.find(b"\n", pos) + 1 or end
+            self._file.write(view[pos:cut])
+            self._feed_stages(data, pos, cut)
+            self.bytes_in_segment += cut - pos
+            pos = cut
+            self._rotate()
+        if pos < end:
+            self._file.write(view[pos:])
+            self._feed_stages(data, pos, end)
+            self.bytes_in_segment += end - pos
+
+    def _flush(self):
+        if self._file is not None and self.error is None:
+            try:
+                self._file.flush()
+            except Exception as e:
+                print(f"[Capture] Flush failed for {self.log_file_base}: {e}")
+                self.error = e
+
+    def _finish(self):
+        try:
+            self._file.close()
+        except Exception:
+            pass
+        self._segment_closed()
+        self._lock.release()
+        self._closed.set()
+
+    def _open_segment(self):
+        self._file = open(self.segment_path(self.file_index), "ab", buffering=WRITE_BUFFER_SIZE)
+        self.bytes_in_segment = self._file.tell()
+        for stage in self.stages:
+            stage.segment_opened(self.segment_path(self.file_index), self.bytes_in_segment)
+
+    def _feed_stages(self, data, pos, end):
+        self.bytes_written += end - pos
+        for stage in list(self.stages):
+            try:
+                stage.feed(data, self.bytes_in_segment, pos, end)
+            except Exception as e:
+                # Stages are optional: drop the stage rather than the capture.
+                print(f"[Capture] {type(stage).__name__} failed for {self.log_file_base}, disabling it: {e}")
+                self.stages.remove(stage)
+
+    def _rotate(self):
+        self._file.close()
+        self._segment_closed()
+        self.file_index += 1
+        self._open_segment()
+
+    def _segment_closed(self):
+        for stage in self.stages:
+            try:
+                stage.segment_closed(self.segment_path(self.file_index))
+            except Exception as e:
+                print(f"[Capture] {type(stage).__name__} failed to close {self.segment_path(self.file_index)}: {e}")
+        if self.on_segment_closed is None:
+            return
+        try:
+            self.on_segment_closed(self.segment_path(self.file_index))
+        except Exception as e:
+            print(f"[Capture] Segment callback failed for {self.segment_path(self.file_index)}: {e}")
@@ -0,0 +1,109 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ---------------- CAPTURE METRICS ----------------
+# MetricsSampler turns supervisor/writer/matcher counters into one JSON-ready
+# snapshot (rates are per sample interval); MetricsServer serves the latest
+# snapshot on http://127.0.0.1:<port>/metrics for CI rigs to scrape.
+
+METRICS_PORT = 8765
+SAMPLE_INTERVAL = 1.0
+
+
+class MetricsSampler:
+    def __init__(self, supervisor, alerts=None):
+        self.supervisor = supervisor
+        self.alerts = alerts
+        self.started = time.monotonic()
+        self._last = None
+        self._last_sessions = {}
+        self._snapshot = {}
+        self._lock = threading.Lock()
+
+    def sample(self):
+        now = time.monotonic()
+        lines, written, dropped = self.supervisor.totals()
+        if self._last is None:
+            elapsed, prev_lines, prev_bytes = now - self.started, 0, 0
+        else:
+            elapsed, prev_lines, prev_bytes = now - self._last[0], self._last[1], self._last[2]
+        self._last = (now, lines, written)
+
+        sessions = []
+        last_sessions = {}
+        for s in self.supervisor.sessions():
+            key = (s.platform, s.serial)
+            s_lines = s.counter.value
+            s_bytes = s.writer.bytes_written if s.writer is not None else 0
+            then, then_lines, then_bytes = self._last_sessions.get(key, (now - elapsed, 0, 0))
+            span = max(now - then, 1e-9)
+            last_sessions[key] = (now, s_lines, s_bytes)
+            sessions.append({
+                "platform": s.platform,
+                "serial": s.serial,
+                "lines": s_lines,
+                "bytes": s_bytes,
+                "lines_per_sec": round((s_lines - then_lines) / span, 1),
+                "bytes_per_sec": round((s_bytes - then_bytes) / span, 1),
+                "dropped_lines": s.writer.dropped_lines if s.writer is not None else 0,
+                "error": str(s.error) if s.error else None,
+            })
+        self._last_sessions = last_sessions
+
+        span = max(elapsed, 1e-9)
+        snapshot = {
+            "time": time.time(),
+            "uptime_sec": round(now - self.started, 1),
+            "lines": lines,
+            "bytes": written,
+            "lines_per_sec": round((lines - prev_lines) / span, 1),
+            "bytes_per_sec": round((written - prev_bytes) / span, 1),
+            "dropped_lines": dropped,
+            "writer_queue_depth": self.supervisor.pool.queue_depth,
+            "write_latency_ms": self.supervisor.pool.latency.percentiles(),
+            "sessions": sessions,
+            "matches": self.alerts.counts() if self.alerts is not None else {},
+            "alerts": [a._asdict() for a in self.alerts.recent_alerts] if self.alerts is not None else [],
+        }
+        with self._lock:
+            self._snapshot = snapshot
+        return snapshot
+
+    def latest(self):
+        with self._lock:
+            return self._snapshot
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.rstrip("/") not in ("", "/metrics"):
+            self.send_error(404)
+            return
+        body = json.dumps(self.server.snapshot(), indent=2).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class MetricsServer:
+    def __init__(self, snapshot, host="127.0.0.1", port=METRICS_PORT):
+        # snapshot: callable returning the dict to serve
+        self._httpd = ThreadingHTTPServer((host, port), _MetricsHandler)
+        self._httpd.snapshot = snapshot
+        self.port = self._httpd.server_address[1]
+        self.url = f"http://{host}:{self.port}/metrics"
+
+    def start(self):
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def close(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
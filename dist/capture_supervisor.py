@@ -0,0 +1,219 @@
+import datetime
+import functools
+import os
+import re
+import subprocess
+import threading
+import time
+
+from capture_engine import CaptureWriter, LineCounter, WriterPool
+from logcat_columns import ColumnStage
+
+# ---------------- CAPTURE SUPERVISOR ----------------
+# One independent session per device serial (or iOS UDID). Each session owns
+# its reader thread, counters and log directory; all sessions share one
+# bounded WriterPool. A failing session only ends itself. Nothing here uses
+# Tk, so the GUI and the headless runner share it.
+
+MAX_LOG_SIZE = 5 * 1024 * 1024  # 5 MB per segment
+
+# Each session's source runs on a thread of its own; this names the session
+# for capture_process().
+_session_thread = threading.local()
+
+
+def safe_dir_name(serial):
+    # Serials like "192.168.1.20:5555" are not valid Windows directory names.
+    return re.sub(r"[^A-Za-z0-9._-]", "_", serial)
+
+
+def session_log_base(tester, feature, platform, serial=None, logs_root="logs"):
+    now = datetime.datetime.now()
+    log_dir = os.path.join(logs_root, now.strftime("%Y%m%d"), tester, now.strftime("%H"), feature, platform.lower())
+    if serial:
+        log_dir = os.path.join(log_dir, safe_dir_name(serial))
+    os.makedirs(log_dir, exist_ok=True)
+    return os.path.join(log_dir, f"log_{tester}_{feature}")
+
+
+def capture_process(command, writer, keep_running):
+    proc = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    session = getattr(_session_thread, "session", None)
+    if session is not None:
+        # Lets CaptureSession.stop() end a quiet pipe instead of waiting for its next line.
+        session.process = proc
+    try:
+        writer.pump(proc.stdout, keep_running)
+    finally:
+        if proc.poll() is None:
+            proc.terminate()
+        proc.stdout.close()
+
+
+# ---------------- LOGGING SOURCES ----------------
+# source(writer, keep_running) callables; bind the leading arguments with functools.partial.
+STRUCTURED_PLATFORMS = ["Android", "Amazon"]  # logcat threadtime, parsed into column files
+IOS_TOOLS_DIR = os.path.join(os.getcwd(), "ios_tools")
+
+
+def platform_source(platform, serial, ios_tools_dir):
+    if platform in ["Android", "Amazon"]:
+        return functools.partial(run_adb_logcat, platform, serial)
+    if platform == "iOS":
+        return functools.partial(run_ios_syslog, os.path.join(ios_tools_dir, "idevicesyslog.exe"), serial)
+    return functools.partial(simulate_log_capture, platform)
+
+
+def run_adb_logcat(platform, serial, writer, keep_running, adb="adb"):
+    try:
+        subprocess.run([adb, "-s", serial, "logcat", "-c"], check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        print(f"[{platform}] {serial}: device log buffer cleared")
+    except Exception as e:
+        print(f"[{platform}] {serial}: failed to clear device log buffer: {e}")
+    capture_process([adb, "-s", serial, "logcat", "-v", "threadtime"], writer, keep_running)
+
+
+def run_ios_syslog(idevicesyslog_path, udid, writer, keep_running):
+    capture_process([idevicesyslog_path, "-u", udid], writer, keep_running)
+
+
+def simulate_log_capture(platform, writer, keep_running):
+    while keep_running():
+        line = f"{platform} log entry at {datetime.datetime.now()}\n"
+        writer.submit(line.encode("utf-8"), 1)
+        time.sleep(1)
+
+
+class CaptureSession:
+    def __init__(self, platform, serial, log_file_base, structured=False):
+        self.platform = platform
+        self.serial = serial
+        self.log_file_base = log_file_base
+        self.structured = structured
+        self.counter = LineCounter()
+        self.running = True
+        self.process = None
+        self.error = None
+        self.writer = None
+        self.started_at = time.time()
+        self.lines_per_sec = 0.0
+        self._last_sample = (time.monotonic(), 0)
+
+    @property
+    def name(self):
+        return self.serial or self.platform
+
+    def stop(self):
+        self.running = False
+        proc = self.process
+        if proc is not None and proc.poll() is None:
+            # pump() then sees EOF and the session closes its writer as usual.
+            proc.terminate()
+
+    def sample_rate(self):
+        now, lines = time.monotonic(), self.counter.value
+        last_time, last_lines = self._last_sample
+        if now > last_time:
+            self.lines_per_sec = (lines - last_lines) / (now - last_time)
+        self._last_sample = (now, lines)
+        return self.lines_per_sec
+
+
+class CaptureSupervisor:
+    # stage_factories: callables taking a CaptureSession and returning a
+    # writer stage, e.g. KeywordAlerts.stage for live matching.
+    def __init__(self, max_size, writer_workers=None, on_segment_closed=None, stage_factories=()):
+        self.max_size = max_size
+        self.on_segment_closed = on_segment_closed
+        self.stage_factories = list(stage_factories)
+        self.pool = WriterPool(writer_workers) if writer_workers else WriterPool()
+        self._sessions = {}
+        self._finished_lines = {}
+        self._finished_bytes = 0
+        self._finished_dropped = 0
+        self._lock = threading.Lock()
+
+    def start_session(self, platform, serial, log_file_base, source, structured=False):
+        # source(writer, keep_running) produces the session's log data until
+        # it returns or keep_running() turns False. structured=True parses
+        # logcat threadtime lines into column files next to each segment.
+        key = (platform, serial)
+        with self._lock:
+            if key in self._sessions:
+                return self._sessions[key]
+            session = CaptureSession(platform, serial, log_file_base, structured)
+            self._sessions[key] = session
+        threading.Thread(target=self._run_session, args=(session, source), daemon=True).start()
+        return session
+
+    def start_device_session(self, tester, feature, platform, serial, ios_tools_dir=IOS_TOOLS_DIR,
+                             parse_columns=True):
+        # One session per connected device, as both the GUI and headless_capture start them.
+        if self.has_session(platform, serial):
+            return None
+        return self.start_session(platform, serial, session_log_base(tester, feature, platform, serial),
+                                  platform_source(platform, serial, ios_tools_dir),
+                                  structured=parse_columns and platform in STRUCTURED_PLATFORMS)
+
+    def _run_session(self, session, source):
+        try:
+            stages = [factory(session) for factory in self.stage_factories]
+            if session.structured:
+                stages.append(ColumnStage())
+            session.writer = CaptureWriter(session.log_file_base, self.max_size, session.counter,
+                                           on_segment_closed=self.on_segment_closed, pool=self.pool,
+                                           stages=stages).start()
+            _session_thread.session = session
+            source(session.writer, lambda: session.running)
+        except Exception as e:
+            print(f"[{session.platform}] Session {session.name} failed: {e}")
+            session.error = e
+        finally:
+            if session.writer is not None:
+                session.writer.close()
+            session.running = False
+            with self._lock:
+                self._sessions.pop((session.platform, session.serial), None)
+                self._finished_lines[session.platform] = \
+                    self._finished_lines.get(session.platform, 0) + session.counter.value
+                if session.writer is not None:
+                    self._finished_bytes += session.writer.bytes_written
+                    self._finished_dropped += session.writer.dropped_lines
+            print(f"[{session.platform}] Session {session.name} ended after {session.counter.value} lines")
+
+    def stop_platform(self, platform):
+        for session in self.sessions(platform):
+            session.stop()
+
+    def sessions(self, platform=None):
+        with self._lock:
+            return [s for s in self._sessions.values() if platform is None or s.platform == platform]
+
+    def has_session(self, platform, serial):
+        with self._lock:
+            return (platform, serial) in self._sessions
+
+    def is_running(self, platform):
+        return bool(self.sessions(platform))
+
+    def lines(self, platform):
+        with self._lock:
+            active = sum(s.counter.value for s in self._sessions.values() if s.platform == platform)
+            return self._finished_lines.get(platform, 0) + active
+
+    def totals(self):
+        # (lines, bytes written, dropped lines) over every session so far
+        with self._lock:
+            sessions = list(self._sessions.values())
+            lines = sum(self._finished_lines.values())
+            written, dropped = self._finished_bytes, self._finished_dropped
+        for s in sessions:
+            lines += s.counter.value
+            if s.writer is not None:
+                written += s.writer.bytes_written
+                dropped += s.writer.dropped_lines
+        return lines, written, dropped
+
+    def sample_rates(self):
+        return {(s.platform, s.serial): s.sample_rate() for s in self.sessions()}
@@ -0,0 +1,208 @@
+import os
+import queue
+import socket
+import subprocess
+import threading
+from collections import namedtuple
+
+# ---------------- DEVICE REGISTRY ----------------
+# Holds one persistent connection to the adb server and lets it push device
+# changes (host:track-devices), instead of forking `adb devices` in a loop.
+# iOS has no equivalent push channel here, so idevice_id is polled slowly.
+# Changes are queued; the Tk loop calls drain() to deliver them to subscribers.
+
+ADB_HOST = "127.0.0.1"
+ADB_PORT = int(os.environ.get("ANDROID_ADB_SERVER_PORT", "5037"))
+ADB_RETRY_INTERVAL = 2
+ADB_MAX_RETRY_INTERVAL = 60
+IOS_POLL_INTERVAL = 5
+AMAZON_MODEL_PREFIXES = ("KF", "AFT")  # Fire tablets / Fire TV
+
+Device = namedtuple("Device", "serial transport state model")
+
+
+def parse_device_list(payload, transport="adb"):
+    devices = {}
+    for line in payload.splitlines():
+        parts = line.split()
+        if len(parts) < 2:
+            continue
+        serial, state = parts[0], parts[1]
+        model = None
+        for part in parts[2:]:
+            if part.startswith("model:"):
+                model = part[len("model:"):]
+        devices[serial] = Device(serial, transport, state, model)
+    return devices
+
+
+def device_platform(device):
+    if device.transport == "ios":
+        return "iOS"
+    model = device.model or ""
+    return "Amazon" if model.startswith(AMAZON_MODEL_PREFIXES) else "Android"
+
+
+class AdbProtocolError(Exception):
+    pass
+
+
+def _recv_exact(sock, size):
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("adb server closed the connection")
+        data += chunk
+    return data
+
+
+def _read_message(sock):
+    length = int(_recv_exact(sock, 4), 16)
+    return _recv_exact(sock, length).decode("utf-8", errors="replace") if length else ""
+
+
+def _send_request(sock, request):
+    sock.sendall(b"%04x%s" % (len(request), request))
+    status = _recv_exact(sock, 4)
+    if status == b"OKAY":
+        return
+    if status == b"FAIL":
+        raise AdbProtocolError(_read_message(sock))
+    raise AdbProtocolError(f"unexpected adb reply {status!r}")
+
+
+class DeviceRegistry:
+    def __init__(self, idevice_id_path=None, adb_host=ADB_HOST, adb_port=ADB_PORT,
+                 ios_poll_interval=IOS_POLL_INTERVAL, start_adb_server=True):
+        self.idevice_id_path = idevice_id_path
+        self.adb_host = adb_host
+        self.adb_port = adb_port
+        self.ios_poll_interval = ios_poll_interval
+        self.start_adb_server = start_adb_server
+        self._devices = {}
+        self._lock = threading.Lock()
+        self._events = queue.Queue()
+        self._subscribers = []
+        self._stopped = threading.Event()
+        self._sock = None
+
+    def start(self):
+        threading.Thread(target=self._track_adb, daemon=True).start()
+        if self.idevice_id_path:
+            threading.Thread(target=self._poll_ios, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        sock = self._sock
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+
+    def subscribe(self, callback):
+        # callback(kind, device) with kind in "added", "removed", "changed";
+        # always invoked from drain(), i.e. on the Tk thread.
+        self._subscribers.append(callback)
+
+    def devices(self, transport=None):
+        with self._lock:
+            return [d for d in self._devices.values()
+                    if d.state == "device" and (transport is None or d.transport == transport)]
+
+    def drain(self):
+        while True:
+            try:
+                kind, device = self._events.get_nowait()
+            except queue.Empty:
+                return
+            for callback in list(self._subscribers):
+                try:
+                    callback(kind, device)
+                except Exception as e:
+                    print(f"[Devices] Subscriber failed on {kind} {device.serial}: {e}")
+
+    def _replace(self, transport, devices):
+        with self._lock:
+            old = {s: d for s, d in self._devices.items() if d.transport == transport}
+            for serial, device in old.items():
+                if serial not in devices:
+                    del self._devices[serial]
+                    self._events.put(("removed", device))
+            for serial, device in devices.items():
+                previous = old.get(serial)
+                if previous is None:
+                    self._events.put(("added", device))
+                elif previous != device:
+                    self._events.put(("changed", device))
+                self._devices[serial] = device
+
+    # ---------------- ADB (push) ----------------
+    def _open_tracker(self):
+        for request, long_format in ((b"host:track-devices-l", True), (b"host:track-devices", False)):
+            sock = socket.create_connection((self.adb_host, self.adb_port), timeout=5)
+            try:
+                _send_request(sock, request)
+            except AdbProtocolError:
+                # Older adb servers only know the short form.
+                sock.close()
+                if long_format:
+                    continue
+                raise
+            except Exception:
+                sock.close()
+                raise
+            sock.settimeout(None)
+            return sock
+        raise AdbProtocolError("adb server refused device tracking")
+
+    def _track_adb(self):
+        retry = ADB_RETRY_INTERVAL
+        while not self._stopped.is_set():
+            try:
+                sock = self._open_tracker()
+            except ConnectionRefusedError:
+                if self.start_adb_server:
+                    self._start_adb_server()
+                self._stopped.wait(retry)
+                retry = min(retry * 2, ADB_MAX_RETRY_INTERVAL)
+                continue
+            except (OSError, AdbProtocolError) as e:
+                print(f"[Devices] Could not track adb devices: {e}")
+                self._stopped.wait(retry)
+                retry = min(retry * 2, ADB_MAX_RETRY_INTERVAL)
+                continue
+
+            retry = ADB_RETRY_INTERVAL
+            self._sock = sock
+            try:
+                while True:
+                    self._replace("adb", parse_device_list(_read_message(sock), "adb"))
+            except (OSError, ValueError) as e:
+                if not self._stopped.is_set():
+                    print(f"[Devices] Lost adb server connection: {e}")
+            finally:
+                self._sock = None
+                sock.close()
+                self._replace("adb", {})
+
+    def _start_adb_server(self):
+        try:
+            subprocess.run(["adb", "start-server"], check=False, timeout=30,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        except Exception as e:
+            print(f"[Devices] Failed to start adb server: {e}")
+
+    # ---------------- iOS (slow poll) ----------------
+    def _poll_ios(self):
+        while not self._stopped.is_set():
+            try:
+                result = subprocess.check_output([self.idevice_id_path, "-l"], stderr=subprocess.DEVNULL,
+                                                 text=True, timeout=30)
+                udids = [line.strip() for line in result.splitlines() if line.strip()]
+                self._replace("ios", {u: Device(u, "ios", "device", None) for u in udids})
+            except Exception:
+                self._replace("ios", {})
+            self._stopped.wait(self.ios_poll_interval)
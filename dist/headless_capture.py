@@ -0,0 +1,131 @@
+import argparse
+import json
+import os
+import signal
+import sys
+import threading
+import time
+
+from capture_metrics import METRICS_PORT, SAMPLE_INTERVAL, MetricsSampler, MetricsServer
+from capture_supervisor import IOS_TOOLS_DIR, MAX_LOG_SIZE, CaptureSupervisor
+from device_registry import DeviceRegistry, device_platform
+from live_matcher import KEYWORDS_FILE, configured_alerts, parse_alert_rule
+from segment_compressor import SegmentCompressor
+
+# ---------------- HEADLESS CAPTURE ----------------
+# Tk-free alternative to ask_tester_and_feature() for CI rigs: captures every
+# connected device of the chosen platforms (and any that connect later) until
+# interrupted or --duration runs out, with live keyword alerts and JSON
+# metrics on http://127.0.0.1:<port>/metrics. Run it directly, or through
+# log_capture_tool.py --headless where Tk is installed.
+
+PLATFORMS = ["Android", "Amazon", "iOS"]
+STATUS_INTERVAL = 10
+STOP_TIMEOUT = 10
+
+
+class HeadlessCapture:
+    def __init__(self, tester, feature, platforms=PLATFORMS, alerts=None, metrics_port=METRICS_PORT,
+                 ios_tools_dir=IOS_TOOLS_DIR, registry=None, parse_columns=True):
+        self.tester = tester
+        self.feature = feature
+        self.parse_columns = parse_columns
+        self.platforms = list(platforms)
+        self.ios_tools_dir = ios_tools_dir
+        self.alerts = alerts if alerts is not None else configured_alerts()
+        self.compressor = SegmentCompressor()
+        self.supervisor = CaptureSupervisor(MAX_LOG_SIZE, on_segment_closed=self.compressor.submit,
+                                            stage_factories=[self.alerts.stage])
+        self.metrics = MetricsSampler(self.supervisor, self.alerts)
+        self.server = MetricsServer(self.metrics.latest, port=metrics_port) if metrics_port is not None else None
+        if registry is None:
+            idevice_id = os.path.join(ios_tools_dir, "idevice_id.exe") if "iOS" in self.platforms else None
+            registry = DeviceRegistry(idevice_id)
+        self.devices = registry
+        self._stop = threading.Event()
+
+    def on_device_event(self, kind, device):
+        platform = device_platform(device)
+        print(f"[Devices] {device.transport} {device.serial} {kind}: {device.state}")
+        if kind != "removed" and device.state == "device" and platform in self.platforms:
+            self.supervisor.start_device_session(self.tester, self.feature, platform, device.serial,
+                                                 self.ios_tools_dir, self.parse_columns)
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self, duration=None):
+        self.compressor.sweep()
+        if self.server is not None:
+            self.server.start()
+            print(f"[Headless] Metrics on {self.server.url}")
+        self.devices.subscribe(self.on_device_event)
+        # Devices already connected arrive as "added" events on the first drain().
+        self.devices.start()
+
+        deadline = time.monotonic() + duration if duration else None
+        next_sample = next_status = time.monotonic()
+        try:
+            while not self._stop.is_set() and (deadline is None or time.monotonic() < deadline):
+                self.devices.drain()
+                for alert in self.alerts.drain():
+                    print(f"[Alerts] ALERT: {alert.count}x {alert.keyword} within {alert.window:g}s on {alert.session}")
+                now = time.monotonic()
+                if now >= next_sample:
+                    snapshot = self.metrics.sample()
+                    next_sample = now + SAMPLE_INTERVAL
+                    if now >= next_status:
+                        print(f"[Headless] {len(snapshot['sessions'])} sessions, {snapshot['lines']} lines, "
+                              f"{snapshot['lines_per_sec']:,.0f} lines/s, matches {snapshot['matches']}")
+                        next_status = now + STATUS_INTERVAL
+                self._stop.wait(0.05)
+        finally:
+            self.shutdown()
+        return self.metrics.sample()
+
+    def shutdown(self):
+        for platform in self.platforms:
+            self.supervisor.stop_platform(platform)
+        # Stopping terminates each session's adb/idevicesyslog child; give the writers time to close.
+        deadline = time.monotonic() + STOP_TIMEOUT
+        while self.supervisor.sessions() and time.monotonic() < deadline:
+            time.sleep(0.1)
+        self.devices.stop()
+        self.compressor.shutdown()
+        if self.server is not None:
+            self.server.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Capture device logs without the Tk UI (for CI rigs)")
+    parser.add_argument("--tester", required=True)
+    parser.add_argument("--feature", required=True)
+    parser.add_argument("--platform", action="append", choices=PLATFORMS,
+                        help="platform to capture (repeatable, default: all)")
+    parser.add_argument("--keyword", action="append", default=[], help="extra keyword to match live (repeatable)")
+    parser.add_argument("--alert", action="append", default=[], type=parse_alert_rule,
+                        help="alert rule KEYWORD:COUNT/WINDOW[/COOLDOWN], e.g. GameException:5/10")
+    parser.add_argument("--keywords-file", default=KEYWORDS_FILE)
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT, help="0 picks a free port")
+    parser.add_argument("--no-columns", action="store_true",
+                        help="don't parse logcat into column files while capturing (saves CPU with many devices)")
+    parser.add_argument("--duration", type=float, help="seconds to capture, default until interrupted")
+    parser.add_argument("--summary", help="write the final metrics snapshot to this JSON file")
+    args = parser.parse_args(argv)
+
+    alerts = configured_alerts(args.keywords_file, args.keyword, args.alert)
+    capture = HeadlessCapture(args.tester, args.feature, args.platform or PLATFORMS, alerts, args.metrics_port,
+                              parse_columns=not args.no_columns)
+    signal.signal(signal.SIGINT, lambda *_: capture.stop())
+    if hasattr(signal, "SIGTERM"):
+        signal.signal(signal.SIGTERM, lambda *_: capture.stop())
+    summary = capture.run(args.duration)
+    if args.summary:
+        with open(args.summary, "w") as f:
+            json.dump(summary, f, indent=2)
+    print(f"[Headless] Done: {summary['lines']} lines, {summary['dropped_lines']} dropped, matches {summary['matches']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
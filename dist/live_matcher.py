@@ -0,0 +1,195 @@
+import json
+import queue
+import struct
+import threading
+import time
+from array import array
+from collections import deque, namedtuple
+
+from log_index import KeywordMatcher
+from segment_store import split_sidecar, write_sidecar
+
+# ---------------- LIVE KEYWORD MATCHING ----------------
+# A capture stage that runs the keyword alternation over each batch as the
+# writer worker writes it. Every line with a hit is counted once per keyword
+# it contains, its offset goes to a "<segment>.hits" sidecar, and alert rules
+# ("5 GameException lines within 10 s") fire at most once per cooldown.
+# Counters are shared by all sessions through one KeywordAlerts; alert
+# windows and cooldowns are kept per session, so a rig of quiet devices
+# never adds up to one device's alert.
+
+HITS_SUFFIX = ".hits"
+HITS_MAGIC = b"LCHIT01\n"
+MAX_KEYWORDS = 32  # keyword sets per hit are stored as a u32 mask
+RECENT_ALERTS = 100
+
+AlertRule = namedtuple("AlertRule", "keyword count window cooldown")
+Alert = namedtuple("Alert", "time keyword count window session")
+
+PREDEFINED_KEYWORDS = ["Unity", "GameException", "Exception"]
+DEFAULT_ALERT_RULES = [AlertRule("GameException", 5, 10.0, 60.0)]
+KEYWORDS_FILE = "keywords.json"  # optional extra keywords and alert rules
+
+
+def hits_path(segment_path):
+    return segment_path + HITS_SUFFIX
+
+
+def load_keyword_config(path):
+    # {"keywords": ["ANR"], "alerts": [{"keyword": "ANR", "count": 1, "window": 60, "cooldown": 300}]}
+    try:
+        with open(path) as f:
+            config = json.load(f)
+    except FileNotFoundError:
+        return [], []
+    except (OSError, ValueError) as e:
+        print(f"[Alerts] Ignoring {path}: {e}")
+        return [], []
+    rules = [AlertRule(r["keyword"], int(r.get("count", 1)), float(r.get("window", 10)),
+                       float(r.get("cooldown", 60)))
+             for r in config.get("alerts", [])]
+    return list(config.get("keywords", [])), rules
+
+
+def configured_alerts(path=KEYWORDS_FILE, keywords=(), rules=()):
+    # The predefined keywords and rules, plus those from `path` and any given here.
+    file_keywords, file_rules = load_keyword_config(path)
+    rules = DEFAULT_ALERT_RULES + file_rules + list(rules)
+    keywords = PREDEFINED_KEYWORDS + file_keywords + list(keywords) + [r.keyword for r in rules]
+    return KeywordAlerts(keywords, rules)
+
+
+def parse_alert_rule(text):
+    # "KEYWORD:COUNT/WINDOW[/COOLDOWN]" as given on the command line
+    keyword, _, spec = text.rpartition(":")
+    parts = spec.split("/")
+    if not keyword or len(parts) not in (2, 3):
+        raise ValueError(f"alert rule '{text}' is not KEYWORD:COUNT/WINDOW[/COOLDOWN]")
+    cooldown = float(parts[2]) if len(parts) == 3 else 60.0
+    return AlertRule(keyword, int(parts[0]), float(parts[1]), cooldown)
+
+
+class KeywordAlerts:
+    def __init__(self, keywords, rules=(), clock=time.monotonic):
+        self.keywords = list(dict.fromkeys(kw for kw in keywords if kw))
+        if len(self.keywords) > MAX_KEYWORDS:
+            print(f"[Alerts] Only the first {MAX_KEYWORDS} keywords are matched live")
+            self.keywords = self.keywords[:MAX_KEYWORDS]
+        self.matcher = KeywordMatcher(self.keywords)
+        self.lowered = [kw.lower().encode("utf-8") for kw in self.keywords]
+        self.rules = [r for r in rules if r.keyword in self.keywords]
+        self.recent_alerts = deque(maxlen=RECENT_ALERTS)
+        self.events = queue.Queue()
+        self._clock = clock
+        self._counts = [0] * len(self.keywords)
+        self._windows = {}  # (session, keyword) -> deque of (time, hits)
+        self._last_alert = {}  # (session, keyword) -> time
+        self._lock = threading.Lock()
+
+    def stage(self, session=None):
+        return MatchStage(self, session.name if session is not None else "")
+
+    def counts(self):
+        with self._lock:
+            return dict(zip(self.keywords, self._counts))
+
+    def record(self, session_name, counts):
+        # counts: per-keyword hit lines of one batch, in keyword order.
+        now = self._clock()
+        with self._lock:
+            for i, n in enumerate(counts):
+                self._counts[i] += n
+            for rule in self.rules:
+                key = (session_name, rule.keyword)
+                window = self._windows.get(key)
+                n = counts[self.keywords.index(rule.keyword)]
+                if window is None:
+                    if not n:
+                        continue
+                    window = self._windows[key] = deque()
+                if n:
+                    window.append((now, n))
+                while window and window[0][0] < now - rule.window:
+                    window.popleft()
+                if not window:
+                    del self._windows[key]
+                    continue
+                total = sum(n for _, n in window)
+                last = self._last_alert.get(key)
+                if total >= rule.count and (last is None or now - last >= rule.cooldown):
+                    self._last_alert[key] = now
+                    alert = Alert(time.time(), rule.keyword, total, rule.window, session_name)
+                    self.recent_alerts.append(alert)
+                    self.events.put(alert)
+
+    def drain(self):
+        alerts = []
+        while True:
+            try:
+                alerts.append(self.events.get_nowait())
+            except queue.Empty:
+                return alerts
+
+
+class MatchStage:
+    def __init__(self, alerts, session_name=""):
+        self.alerts = alerts
+        self.session_name = session_name
+        self._offsets = None
+        self._masks = None
+
+    def segment_opened(self, segment_path, size):
+        self._offsets = array("I")
+        self._masks = array("I")
+
+    def feed(self, data, base, pos, endpos):
+        low = data[pos:endpos].lower()
+        search = self.alerts.matcher.pattern.search
+        lowered = self.alerts.lowered
+        counts = [0] * len(lowered)
+        start = 0
+        while True:
+            m = search(low, start)
+            if not m:
+                break
+            line_start = low.rfind(b"\n", 0, m.start()) + 1
+            line_end = low.find(b"\n", m.end())
+            line_end = len(low) if line_end < 0 else line_end + 1
+            # Only lines with a hit get the per-keyword test.
+            line = low[line_start:line_end]
+            mask = 0
+            for i, kw in enumerate(lowered):
+                if kw in line:
+                    mask |= 1 << i
+                    counts[i] += 1
+            self._offsets.append(base + line_start)
+            self._masks.append(mask)
+            start = line_end
+        if any(counts):
+            self.alerts.record(self.session_name, counts)
+
+    def segment_closed(self, segment_path):
+        if self._offsets is None:
+            return
+        header = {"keywords": self.alerts.keywords, "count": len(self._offsets)}
+        write_sidecar(hits_path(segment_path), HITS_MAGIC, header,
+                      [self._offsets.tobytes(), self._masks.tobytes()])
+        self._offsets = self._masks = None
+
+
+def load_hits(segment_path):
+    # (keywords, offsets, masks) from a segment's sidecar, or None.
+    try:
+        with open(hits_path(segment_path), "rb") as f:
+            raw = f.read()
+    except OSError:
+        return None
+    try:
+        header, body = split_sidecar(raw, HITS_MAGIC)
+    except (ValueError, struct.error):
+        return None
+    offsets, masks = array("I"), array("I")
+    size = header["count"] * offsets.itemsize
+    offsets.frombytes(body[:size])
+    masks.frombytes(body[size:2 * size])
+    return header["keywords"], offsets, masks
@@ -1,7 +1,6 @@
 import tkinter as tk
-from tkinter import messagebox, ttk, scrolledtext, filedialog
+from tkinter import messagebox, ttk, filedialog
 import subprocess
-import threading
 import os
 import datetime
 import time
@@ -9,106 +8,71 @@ import urllib.request
 import zipfile
 import shutil
 import sys
-import tempfile
-import hashlib
-import requests
 
-MAX_LOG_SIZE = 5 * 1024 * 1024  # 5 MB
+from capture_supervisor import IOS_TOOLS_DIR, MAX_LOG_SIZE, CaptureSupervisor
+from log_index import KeywordMatcher, session_segments
+from logcat_columns import LEVELS, ColumnQuery, pack_timestamp
+from log_viewer import SearchResults, VirtualLogView, run_in_background
+from device_registry import DeviceRegistry, device_platform
+from segment_compressor import SegmentCompressor
+from ota_update import UpdateProgress, apply_update, fetch_manifest, is_newer
+from live_matcher import configured_alerts
+
+MONITOR_INTERVAL_MS = 2000
+DEVICE_EVENT_INTERVAL_MS = 50
+NO_DEVICE_WARNING_SECONDS = 60
 
 # OTA CONFIG
 APP_VERSION = "1.4.11"
 MANIFEST_URL = "https://raw.githubusercontent.com/saisanthoshmanepalli/LogCaptureTool/main/release/manifest.json"
 
 # ---------------- OTA FUNCTIONS ----------------
-def get_manifest():
-    try:
-        resp = requests.get(MANIFEST_URL, timeout=10)
-        resp.raise_for_status()
-        return resp.json()
-    except Exception as e:
-        print(f"[OTA] Failed to fetch manifest: {e}")
-        return None
+# Everything here runs on the Tk thread; network and disk work goes through
+# run_in_background and progress is polled with after().
+PROGRESS_POLL_MS = 100
 
 def check_for_update(root):
-    manifest = get_manifest()
-    if not manifest:
-        # optionally show a non-blocking toast or print — keep silent to avoid annoying users
-        print("[OTA] No manifest fetched.")
-        return
-    latest_version = manifest["version"]
-    notes = manifest.get("notes", "")
-    if latest_version == APP_VERSION:
-        messagebox.showinfo("No Update", f"You are already on the latest version ({APP_VERSION}).")
-        return
-    if messagebox.askyesno(
-        "Update Available",
-        f"A new version ({latest_version}) is available.\n\n{notes}\n\nUpdate now?"
-    ):
-        threading.Thread(target=lambda: do_update(root, manifest), daemon=True).start()
+    def on_manifest(manifest, error):
+        if error is not None or not manifest:
+            # keep silent to avoid annoying users
+            print(f"[OTA] Failed to fetch manifest: {error}")
+            return
+        latest_version = manifest["version"]
+        notes = manifest.get("notes", "")
+        if not is_newer(latest_version, APP_VERSION):
+            messagebox.showinfo("No Update", f"You are already on the latest version ({APP_VERSION}).")
+            return
+        if messagebox.askyesno(
+            "Update Available",
+            f"A new version ({latest_version}) is available.\n\n{notes}\n\nUpdate now?"
+        ):
+            do_update(root, manifest)
 
-def do_update(root, manifest):
-    url = manifest["url"]
-    sha256_expected = manifest["sha256"]
-    tmp_dir = tempfile.mkdtemp()
-    zip_path = os.path.join(tmp_dir, "update.zip")
+    run_in_background(root, lambda: fetch_manifest(MANIFEST_URL), on_manifest)
 
+def do_update(root, manifest):
+    progress = UpdateProgress()
     progress_win = tk.Toplevel(root)
     progress_win.title("Updating...")
     tk.Label(progress_win, text="Downloading update...").pack(pady=10)
     progress_bar = ttk.Progressbar(progress_win, length=300, mode="determinate")
     progress_bar.pack(pady=10)
-    progress_win.update()
+    finished = False
 
-    try:
-        # ---- Download the update ----
-        with requests.get(url, stream=True) as r:
-            r.raise_for_status()
-            total = int(r.headers.get("content-length", 0))
-            downloaded = 0
-            with open(zip_path, "wb") as f:
-                for chunk in r.iter_content(chunk_size=8192):
-                    if not chunk:
-                        continue
-                    f.write(chunk)
-                    downloaded += len(chunk)
-                    if total > 0:
-                        progress = int(downloaded / total * 100)
-                        progress_bar["value"] = progress
-                        progress_win.update()
-
-        # ---- Verify checksum ----
-        sha256 = hashlib.sha256()
-        with open(zip_path, "rb") as f:
-            for chunk in iter(lambda: f.read(8192), b""):
-                sha256.update(chunk)
-        if sha256.hexdigest() != sha256_expected:
-            messagebox.showerror("Update Failed", "Checksum mismatch. Aborting update.")
-            progress_win.destroy()
+    def poll_progress():
+        if finished:
             return
+        if progress.total > 0:
+            progress_bar["value"] = int(progress.done / progress.total * 100)
+        progress_win.after(PROGRESS_POLL_MS, poll_progress)
 
-        # ---- Extract to temp dir ----
-        extract_dir = os.path.join(tmp_dir, "extracted")
-        os.makedirs(extract_dir, exist_ok=True)
-        with zipfile.ZipFile(zip_path, "r") as zip_ref:
-            zip_ref.extractall(extract_dir)
-
-        # ---- Overwrite current folder ----
-        current_dir = os.getcwd()
-        for item in os.listdir(extract_dir):
-            s = os.path.join(extract_dir, item)
-            d = os.path.join(current_dir, item)
-            if os.path.isdir(s):
-                if os.path.exists(d):
-                    try:
-                        shutil.rmtree(d)
-                    except Exception:
-                        # if failed to remove, try copying over
-                        pass
-                shutil.copytree(s, d)
-            else:
-                shutil.copy2(s, d)
-
+    def on_done(_, error):
+        nonlocal finished
+        finished = True
         progress_win.destroy()
+        if error is not None:
+            messagebox.showerror("Update Failed", f"Error during update:\n{error}")
+            return
         messagebox.showinfo("Update Complete", f"Tool updated to {manifest['version']}.\nRestarting now...")
 
         # ---- Restart from the same script ----
@@ -116,11 +80,9 @@ def do_update(root, manifest):
         script_path = os.path.abspath(sys.argv[0])
         os.execl(exe, exe, script_path, *sys.argv[1:])
 
-    except Exception as e:
-        progress_win.destroy()
-        messagebox.showerror("Update Failed", f"Error during update:\n{e}")
-    finally:
-        shutil.rmtree(tmp_dir, ignore_errors=True)
+    poll_progress()
+    # Only changed files are fetched; each one is installed with an atomic rename.
+    run_in_background(root, lambda: apply_update(manifest, os.getcwd(), progress), on_done)
 
 
 # ---------------- iOS TOOLS ----------------
@@ -128,7 +90,6 @@ IOS_RELEASE_URL = (
     "https://github.com/libimobiledevice-win32/imobiledevice-net/releases/download/"
     "v1.3.17/libimobiledevice.1.2.1-r1122-win-x64.zip"
 )
-IOS_TOOLS_DIR = os.path.join(os.getcwd(), "ios_tools")
 
 def prepare_ios_tools():
     if os.path.exists(IOS_TOOLS_DIR) and os.path.isfile(os.path.join(IOS_TOOLS_DIR, "idevice_id.exe")):
@@ -171,10 +132,9 @@ class LogCaptureApp:
         "button_bg": "#3498db",
         "button_fg": "#ffffff",
         "button_disabled": "#95a5a6",
+        "alert_text": "#ff7675",
     }
 
-    PREDEFINED_KEYWORDS = ["Unity", "GameException", "Exception"]
-
     def __init__(self, root, tester_name, feature_name):
         self.root = root
         self.tester_name = tester_name
@@ -191,9 +151,15 @@ class LogCaptureApp:
         # Manual update check button
         check_btn = tk.Button(top_frame, text="Check for Updates", width=16,
                               bg="#2980b9", fg="#ffffff",
-                              command=lambda: threading.Thread(target=check_for_update, args=(self.root,), daemon=True).start())
+                              command=lambda: check_for_update(self.root))
         check_btn.pack(side="right", padx=10)
 
+        # Parsing logcat into column files costs writer CPU on every line; with
+        # many devices it can be turned off (the viewer then parses on demand).
+        self.parse_columns = tk.BooleanVar(value=True)
+        tk.Checkbutton(top_frame, text="Parse logcat for filters", variable=self.parse_columns,
+                       bg="#ecf0f1").pack(side="right", padx=10)
+
         self.platforms = ["Android", "iOS", "Amazon", "WebGL", "Standalone"]
 
         # Dashboard
@@ -206,18 +172,34 @@ class LogCaptureApp:
         for platform in self.platforms:
             lbl = tk.Label(self.dashboard_frame, text=f"{platform}: 0 logs",
                            font=("Arial", 12, "bold"), fg=self.COLORS["dashboard_text"],
-                           bg=self.COLORS["dashboard_bg"], width=25, anchor="w", padx=10, pady=5)
+                           bg=self.COLORS["dashboard_bg"], width=40, anchor="w", padx=10, pady=5)
             lbl.pack(pady=2)
             self.dashboard_labels[platform] = lbl
+        self.device_rates_label = tk.Label(self.dashboard_frame, text="", font=("Arial", 10),
+                                           fg=self.COLORS["dashboard_text"], bg=self.COLORS["dashboard_frame"],
+                                           justify="left", anchor="w")
+        self.device_rates_label.pack(fill="x", padx=10, pady=2)
+        self.matches_label = tk.Label(self.dashboard_frame, text="", font=("Arial", 10),
+                                      fg=self.COLORS["dashboard_text"], bg=self.COLORS["dashboard_frame"], anchor="w")
+        self.matches_label.pack(fill="x", padx=10, pady=2)
+        self.alert_label = tk.Label(self.dashboard_frame, text="", font=("Arial", 10, "bold"),
+                                    fg=self.COLORS["alert_text"], bg=self.COLORS["dashboard_frame"], anchor="w")
+        self.alert_label.pack(fill="x", padx=10, pady=2)
 
         # Controls
         self.status_labels = {}
         self.line_labels = {}
         self.buttons = {}
         self.view_buttons = {}
-        self.log_threads = {}
-        self.running_flags = {}
-        self.line_counters = {}
+        self.logging_platforms = set()
+        # Closed segments are indexed and compressed in a low-priority worker process
+        self.compressor = SegmentCompressor()
+        self.compressor.sweep()
+        # Keywords are matched live as logs are written; bursts raise dashboard alerts
+        self.alerts = configured_alerts()
+        self.keywords = self.alerts.keywords
+        self.supervisor = CaptureSupervisor(MAX_LOG_SIZE, on_segment_closed=self.compressor.submit,
+                                            stage_factories=[self.alerts.stage])
 
         for platform in self.platforms:
             frame = tk.Frame(root, bg="#ecf0f1", relief="groove", bd=2)
@@ -245,87 +227,84 @@ class LogCaptureApp:
             view_btn.pack(side="right", padx=10)
             self.view_buttons[platform] = view_btn
 
-            self.running_flags[platform] = False
-            self.line_counters[platform] = 0
-
-        # start monitors
+        # start monitors: device changes are pushed by the registry and drained on the Tk thread
+        self.last_no_device_time = None
+        self.devices = DeviceRegistry(os.path.join(IOS_TOOLS_DIR, "idevice_id.exe")).start()
+        self.devices.subscribe(self.on_device_event)
         self.update_status_labels()
         self.update_dashboard()
-        threading.Thread(target=self.monitor_loop, daemon=True).start()
-        self.last_no_device_time = None
-        threading.Thread(target=self.device_disconnect_monitor, daemon=True).start()
+        self.root.after(DEVICE_EVENT_INTERVAL_MS, self.drain_device_events)
+        self.root.after(MONITOR_INTERVAL_MS, self.monitor_loop)
 
         # Run an automatic update check shortly after UI loads (non-blocking)
-        self.root.after(2000, lambda: threading.Thread(target=check_for_update, args=(self.root,), daemon=True).start())
+        self.root.after(2000, lambda: check_for_update(self.root))
 
     # ---------------- LOG VIEWER WITH DOWNLOAD ----------------
     def view_logs_popup(self, platform):
         date_str = datetime.datetime.now().strftime("%Y%m%d")
-        hour_str = datetime.datetime.now().strftime("%H")
-        log_dir = os.path.join("logs", date_str, self.tester_name, hour_str, self.feature_name, platform.lower())
-        if not os.path.exists(log_dir):
+        if not session_segments(date_str, self.tester_name, self.feature_name, platform):
             messagebox.showinfo("No Logs", f"No logs found for {platform} yet.")
             return
 
         popup = tk.Toplevel(self.root)
         popup.title(f"View Logs - {platform}")
-        popup.geometry("800x600")
+        popup.geometry("800x650")
 
         tk.Label(popup, text=f"Filter Keywords:", font=("Arial", 12, "bold")).pack(pady=5)
         keyword_vars = {}
         frame = tk.Frame(popup)
         frame.pack()
-        for kw in self.PREDEFINED_KEYWORDS:
+        for kw in self.keywords:
             var = tk.BooleanVar(value=True)
             tk.Checkbutton(frame, text=kw, variable=var, font=("Arial", 12)).pack(side="left", padx=5)
             keyword_vars[kw] = var
 
-        text_area = scrolledtext.ScrolledText(popup, width=100, height=25)
-        text_area.pack(pady=10)
+        # Structured filters, answered from the logcat column files
+        filter_frame = tk.Frame(popup)
+        filter_frame.pack(pady=5)
+        level_var = tk.StringVar(value="Any")
+        tk.Label(filter_frame, text="Level >=").pack(side="left")
+        tk.OptionMenu(filter_frame, level_var, "Any", "V", "D", "I", "W", "E", "F").pack(side="left", padx=(0, 10))
+        filter_entries = {}
+        for label, width in [("Tags", 18), ("PID", 7), ("From", 8), ("To", 8)]:
+            tk.Label(filter_frame, text=f"{label}:").pack(side="left")
+            entry = tk.Entry(filter_frame, width=width)
+            entry.pack(side="left", padx=(0, 10))
+            filter_entries[label] = entry
+
+        viewer = VirtualLogView(popup, width=100, height=25)
+        viewer.pack(pady=10)
 
-        filtered_lines = []
+        results = None
 
         def search_logs():
-            nonlocal filtered_lines
-            text_area.delete("1.0", tk.END)
-            filtered_lines.clear()
+            nonlocal results
             keywords = [kw for kw, var in keyword_vars.items() if var.get()]
-            if not keywords:
-                messagebox.showwarning("No Keywords", "Select at least one keyword")
+            try:
+                query = self.column_query(date_str, level_var.get(),
+                                          *(filter_entries[k].get() for k in ["Tags", "PID", "From", "To"]))
+            except ValueError as e:
+                messagebox.showwarning("Invalid Filter", str(e))
+                return
+            if not keywords and query is None:
+                messagebox.showwarning("No Keywords", "Select at least one keyword or filter")
                 return
+            if results is not None:
+                results.cancel()
 
             colors = ["#e74c3c", "#f1c40f", "#2ecc71", "#3498db", "#8e44ad"]
             for i, kw in enumerate(keywords):
-                text_area.tag_config(kw, foreground=colors[i % len(colors)], font=("Arial", 10, "bold"))
+                viewer.text.tag_config(kw, foreground=colors[i % len(colors)], font=("Arial", 10, "bold"))
 
-            log_files = sorted(
-                f for f in os.listdir(log_dir)
-                if f.startswith(f"log_{self.tester_name}_{self.feature_name}") and f.endswith(".txt")
-            )
-
-            for file in log_files:
-                file_path = os.path.join(log_dir, file)
-                with open(file_path, "r", encoding="utf-8", errors="replace") as f:
-                    for line in f:
-                        if any(kw.lower() in line.lower() for kw in keywords):
-                            start_index = text_area.index(tk.END)
-                            text_area.insert(tk.END, line)
-                            filtered_lines.append(line)
-                            for kw in keywords:
-                                idx = start_index
-                                while True:
-                                    idx = text_area.search(kw, idx, nocase=1, stopindex=tk.END)
-                                    if not idx:
-                                        break
-                                    end_idx = f"{idx}+{len(kw)}c"
-                                    text_area.tag_add(kw, idx, end_idx)
-                                    idx = end_idx
-
-            text_area.see(tk.END)
-            download_btn.config(state="normal")
+            # Spans every hour of today's session, using segment indexes where available
+            segments = session_segments(date_str, self.tester_name, self.feature_name, platform)
+            download_btn.config(state="disabled")
+            matcher = KeywordMatcher(keywords) if keywords else None
+            results = SearchResults(segments, matcher, self.compressor, query).start()
+            viewer.show_results(results, keywords, on_done=lambda: download_btn.config(state="normal"))
 
         def download_filtered_logs():
-            if not filtered_lines:
+            if results is None or not len(results):
                 messagebox.showwarning("No Data", "No filtered logs to download.")
                 return
             save_path = filedialog.asksaveasfilename(
@@ -334,9 +313,19 @@ class LogCaptureApp:
                 title="Save Filtered Logs As"
             )
             if save_path:
-                with open(save_path, "w", encoding="utf-8") as f:
-                    f.writelines(filtered_lines)
-                messagebox.showinfo("Download Complete", f"Filtered logs saved to {save_path}")
+                def on_saved(_, error):
+                    if error is not None:
+                        messagebox.showerror("Download Failed", f"Could not save filtered logs:\n{error}")
+                    else:
+                        messagebox.showinfo("Download Complete", f"Filtered logs saved to {save_path}")
+                run_in_background(popup, lambda: results.write_to(save_path), on_saved)
+
+        def on_close():
+            if results is not None:
+                results.cancel()
+            popup.destroy()
+
+        popup.protocol("WM_DELETE_WINDOW", on_close)
 
         tk.Button(popup, text="Search", command=search_logs,
                   bg="#27ae60", fg="#ffffff", font=("Arial", 12, "bold")).pack(pady=5)
@@ -346,48 +335,55 @@ class LogCaptureApp:
                                  fg="#ffffff", font=("Arial", 12, "bold"), state="disabled")
         download_btn.pack(pady=5)
 
-    # ---------------- DEVICE CHECKS ----------------
-    def is_android_device_connected(self):
-        try:
-            result = subprocess.check_output(["adb", "devices"], stderr=subprocess.STDOUT, text=True)
-            devices = [line for line in result.strip().split("\n")[1:] if "device" in line]
-            return len(devices) > 0
-        except Exception:
-            return False
+    def column_query(self, date_str, level, tags, pids, start, end):
+        # Returns None when no structured filter is set. Times are HH:MM[:SS] on the session date.
+        month, day = int(date_str[4:6]), int(date_str[6:8])
 
-    def is_ios_device_connected(self):
+        def timestamp(text, end_of_range):
+            try:
+                parts = [int(p) for p in text.split(":")]
+            except ValueError:
+                parts = []
+            if len(parts) not in (2, 3) or not (0 <= parts[0] < 24 and all(0 <= p < 60 for p in parts[1:])):
+                raise ValueError(f"Time '{text}' is not HH:MM or HH:MM:SS")
+            if len(parts) == 2:
+                parts.append(59 if end_of_range else 0)
+            return pack_timestamp(month, day, *parts, 999 if end_of_range else 0)
+
+        tags = [t.strip() for t in tags.split(",") if t.strip()]
         try:
-            idevice_id = os.path.join(IOS_TOOLS_DIR, "idevice_id.exe")
-            result = subprocess.check_output([idevice_id, "-l"], stderr=subprocess.STDOUT, text=True)
-            return len(result.strip().splitlines()) > 0
-        except Exception:
-            return False
+            pids = [int(p) for p in pids.replace(",", " ").split()]
+        except ValueError:
+            raise ValueError("PID must be a number or a list of numbers")
+        query = ColumnQuery(
+            min_level=LEVELS.get(level),
+            tags=tags or None,
+            pids=pids or None,
+            start_ts=timestamp(start.strip(), False) if start.strip() else None,
+            end_ts=timestamp(end.strip(), True) if end.strip() else None,
+        )
+        return query if any(v is not None for v in query) else None
+
+    # ---------------- DEVICE CHECKS ----------------
+    def platform_devices(self, platform):
+        if platform in ["Android", "Amazon", "iOS"]:
+            return [d.serial for d in self.devices.devices() if device_platform(d) == platform]
+        return [None]
 
     # ---------------- START LOGGING ----------------
     def start_logging(self, platform):
-        if self.running_flags[platform]:
+        if self.supervisor.is_running(platform):
             messagebox.showwarning("Already Running", f"{platform} logging is already running.")
             return
+        serials = self.platform_devices(platform)
+        if not serials:
+            messagebox.showwarning("No Device", f"No {platform} device is connected.")
+            return
 
-        self.running_flags[platform] = True
         self.status_labels[platform].config(text="Starting...", bg=self.COLORS["logging"])
         self.buttons[platform].config(state="disabled", bg=self.COLORS["button_disabled"])
 
-        date_str = datetime.datetime.now().strftime("%Y%m%d")
-        hour_str = datetime.datetime.now().strftime("%H")
-        tester = self.tester_name
-        log_dir = os.path.join("logs", date_str, tester, hour_str, self.feature_name, platform.lower())
-        os.makedirs(log_dir, exist_ok=True)
-        log_file_base = os.path.join(log_dir, f"log_{tester}_{self.feature_name}")
-
-        # Clear device log buffer
-        if platform in ["Android", "Amazon"]:
-            try:
-                subprocess.run(["adb", "logcat", "-c"], check=True)
-                print(f"[{platform}] Device log buffer cleared")
-            except Exception as e:
-                print(f"[{platform}] Failed to clear device log buffer: {e}")
-        elif platform == "iOS":
+        if platform == "iOS":
             try:
                 subprocess.run(["taskkill", "/F", "/IM", "idevicesyslog.exe"], check=False,
                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
@@ -395,129 +391,70 @@ class LogCaptureApp:
             except Exception as e:
                 print(f"[iOS] Failed to clear idevicesyslog: {e}")
 
-        # Start logging thread
-        if platform in ["Android", "Amazon"]:
-            thread = threading.Thread(target=self._run_adb_logcat, args=(platform, log_file_base), daemon=True)
-        elif platform == "iOS":
-            thread = threading.Thread(target=self._run_ios_syslog, args=(platform, log_file_base), daemon=True)
-        else:
-            thread = threading.Thread(target=self._simulate_log_capture, args=(platform, log_file_base), daemon=True)
+        # Devices that connect while the platform is logging get their own session too
+        self.logging_platforms.add(platform)
+        for serial in serials:
+            self.start_device_session(platform, serial)
 
-        self.log_threads[platform] = thread
-        thread.start()
-
-    # ---------------- LOGGING THREADS ----------------
-    def _run_adb_logcat(self, platform, log_file_base):
-        try:
-            proc = subprocess.Popen(["adb", "logcat"], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
-            file_index = 1
-            log_file_path = f"{log_file_base}_{file_index}.txt"
-            f = open(log_file_path, "a", encoding="utf-8")
-
-            while self.running_flags[platform]:
-                line = proc.stdout.readline()
-                if not line:
-                    break
-                f.write(line)
-                self.line_counters[platform] += 1
-
-                if f.tell() >= MAX_LOG_SIZE:
-                    f.close()
-                    file_index += 1
-                    log_file_path = f"{log_file_base}_{file_index}.txt"
-                    f = open(log_file_path, "a", encoding="utf-8")
-
-        finally:
-            f.close()
-            self.running_flags[platform] = False
-            if proc.poll() is None:
-                proc.terminate()
-
-    def _run_ios_syslog(self, platform, log_file_base):
-        try:
-            subprocess.run(["taskkill", "/F", "/IM", "idevicesyslog.exe"], check=False,
-                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            proc = subprocess.Popen([os.path.join(IOS_TOOLS_DIR, "idevicesyslog.exe")],
-                                    stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
-            file_index = 1
-            log_file_path = f"{log_file_base}_{file_index}.txt"
-            f = open(log_file_path, "a", encoding="utf-8")
-
-            while self.running_flags[platform]:
-                line = proc.stdout.readline()
-                if not line:
-                    break
-                f.write(line)
-                self.line_counters[platform] += 1
-
-                if f.tell() >= MAX_LOG_SIZE:
-                    f.close()
-                    file_index += 1
-                    log_file_path = f"{log_file_base}_{file_index}.txt"
-                    f = open(log_file_path, "a", encoding="utf-8")
-
-        finally:
-            f.close()
-            self.running_flags[platform] = False
-            if proc.poll() is None:
-                proc.terminate()
-
-    def _simulate_log_capture(self, platform, log_file_base):
-        file_index = 1
-        log_file_path = f"{log_file_base}_{file_index}.txt"
-        try:
-            f = open(log_file_path, "a", encoding="utf-8")
-            while self.running_flags[platform]:
-                line = f"{platform} log entry at {datetime.datetime.now()}\n"
-                f.write(line)
-                self.line_counters[platform] += 1
-                time.sleep(1)
-                if f.tell() >= MAX_LOG_SIZE:
-                    f.close()
-                    file_index += 1
-                    log_file_path = f"{log_file_base}_{file_index}.txt"
-                    f = open(log_file_path, "a", encoding="utf-8")
-        finally:
-            f.close()
-            self.running_flags[platform] = False
+    def start_device_session(self, platform, serial):
+        # logcat output is parsed into column files for the viewer's structured filters
+        self.supervisor.start_device_session(self.tester_name, self.feature_name, platform, serial,
+                                             parse_columns=self.parse_columns.get())
 
     # ---------------- MONITORING ----------------
+    def drain_device_events(self):
+        self.devices.drain()
+        self.root.after(DEVICE_EVENT_INTERVAL_MS, self.drain_device_events)
+
+    def on_device_event(self, kind, device):
+        label = f"{device.serial} ({device.model})" if device.model else device.serial
+        print(f"[Devices] {device.transport} {label} {kind}: {device.state}")
+        platform = device_platform(device)
+        if kind == "removed":
+            if self.supervisor.has_session(platform, device.serial):
+                print(f"[{platform}] {device.serial} disconnected while logging")
+        elif device.state == "device" and platform in self.logging_platforms:
+            self.start_device_session(platform, device.serial)
+        self.update_status_labels()
+
     def monitor_loop(self):
-        while True:
-            self.update_status_labels()
-            self.update_dashboard()
-            time.sleep(2)
-
-    def device_disconnect_monitor(self):
-        while True:
-            android_connected = self.is_android_device_connected()
-            ios_connected = self.is_ios_device_connected()
-            if not android_connected and not ios_connected:
-                if getattr(self, 'last_no_device_time', None) is None:
-                    self.last_no_device_time = time.time()
-                elif time.time() - self.last_no_device_time >= 60:
-                    self.root.after(0, lambda: messagebox.showwarning(
-                        "Device Disconnected",
-                        "No device has been connected for more than 1 minute!"
-                    ))
-                    self.last_no_device_time = time.time()
-            else:
-                self.last_no_device_time = None
-            time.sleep(5)
+        for platform in list(self.logging_platforms):
+            if not self.supervisor.is_running(platform):
+                self.logging_platforms.discard(platform)
+        self.update_status_labels()
+        self.update_dashboard()
+        self.show_alerts()
+        self.check_no_device()
+        self.root.after(MONITOR_INTERVAL_MS, self.monitor_loop)
+
+    def show_alerts(self):
+        # Rate limited by the alert rules' cooldown; shown on the dashboard, not as popups
+        for alert in self.alerts.drain():
+            when = datetime.datetime.fromtimestamp(alert.time).strftime("%H:%M:%S")
+            text = f"{when} ALERT: {alert.count}x {alert.keyword} within {alert.window:g}s on {alert.session}"
+            print(f"[Alerts] {text}")
+            self.alert_label.config(text=text)
+
+    def check_no_device(self):
+        if self.devices.devices():
+            self.last_no_device_time = None
+        elif self.last_no_device_time is None:
+            self.last_no_device_time = time.time()
+        elif time.time() - self.last_no_device_time >= NO_DEVICE_WARNING_SECONDS:
+            self.last_no_device_time = time.time()
+            messagebox.showwarning(
+                "Device Disconnected",
+                "No device has been connected for more than 1 minute!"
+            )
 
     def update_status_labels(self):
-        android_connected = self.is_android_device_connected()
-        ios_connected = self.is_ios_device_connected()
-
         for platform in self.platforms:
-            if platform in ["Android", "Amazon"]:
-                connected = android_connected
-            elif platform == "iOS":
-                connected = ios_connected
-            else:
-                connected = True
+            connected = bool(self.platform_devices(platform))
+            sessions = self.supervisor.sessions(platform)
 
-            if self.running_flags[platform]:
+            if len(sessions) > 1:
+                status_text, status_bg = f"Logging {len(sessions)} devices...", self.COLORS["logging"]
+            elif sessions:
                 status_text, status_bg = "Logging...", self.COLORS["logging"]
             elif connected:
                 status_text, status_bg = "Connected", self.COLORS["connected"]
@@ -526,15 +463,27 @@ class LogCaptureApp:
 
             self.status_labels[platform].config(text=status_text, bg=status_bg)
 
-            if connected and not self.running_flags[platform]:
+            if connected and not sessions:
                 self.buttons[platform].config(state="normal", bg=self.COLORS["button_bg"])
             else:
                 self.buttons[platform].config(state="disabled", bg=self.COLORS["button_disabled"])
 
     def update_dashboard(self):
+        rates = self.supervisor.sample_rates()
         for platform in self.platforms:
-            self.dashboard_labels[platform].config(text=f"{platform}: {self.line_counters[platform]} lines")
-            self.line_labels[platform].config(text=f"{self.line_counters[platform]} lines")
+            lines = self.supervisor.lines(platform)
+            rate = sum(r for (p, _), r in rates.items() if p == platform)
+            text = f"{platform}: {lines} lines"
+            if self.supervisor.is_running(platform):
+                text += f" | {rate:,.0f} lines/s"
+            self.dashboard_labels[platform].config(text=text)
+            self.line_labels[platform].config(text=f"{lines} lines")
+        self.matches_label.config(text="Matches: " + " | ".join(
+            f"{kw} {count}" for kw, count in self.alerts.counts().items()))
+        self.device_rates_label.config(text="\n".join(
+            f"{serial or platform} ({platform}): {rate:,.0f} lines/s"
+            for (platform, serial), rate in sorted(rates.items(), key=lambda kv: (kv[0][0], kv[0][1] or ""))
+        ))
 
 # ---------------- ENTRY ----------------
 def ask_tester_and_feature():
@@ -564,9 +513,13 @@ def ask_tester_and_feature():
         root = tk.Tk()
         app = LogCaptureApp(root, tester, feature)
         root.mainloop()
+        app.compressor.shutdown()
 
     tk.Button(popup, text="Continue", command=submit, width=15, bg="#2ecc71", fg="#ffffff").pack(pady=20)
     popup.mainloop()
 
 if __name__ == "__main__":
+    if "--headless" in sys.argv[1:]:
+        import headless_capture
+        sys.exit(headless_capture.main([a for a in sys.argv[1:] if a != "--headless"]))
     ask_tester_and_feature()
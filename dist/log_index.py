@@ -0,0 +1,298 @@
+import bisect
+import os
+import re
+import struct
+import threading
+from array import array
+from collections import OrderedDict, namedtuple
+
+from segment_store import is_compressed, range_buffers, split_sidecar, storage_path, write_sidecar
+
+# ---------------- SEGMENT INDEX ----------------
+# Each closed segment gets a sidecar "<segment>.idx" holding its line-offset
+# table and a trigram -> block bitmask posting list. A search only reads the
+# blocks every trigram of a keyword appears in (mmap'd, or inflated one gzip
+# member at a time for compressed segments, see segment_store).
+
+INDEX_SUFFIX = ".idx"
+INDEX_MAGIC = b"LCIDX01\n"
+BLOCK_SIZE = 64 * 1024
+INDEX_CACHE_SIZE = 64
+
+TOKEN_RE = re.compile(rb"[0-9a-z_]+")
+NEWLINE_RE = re.compile(rb"\n")
+WORD_BYTES = frozenset(b"0123456789abcdefghijklmnopqrstuvwxyz_")
+
+LineHit = namedtuple("LineHit", "path line_no start end line")
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def index_path(segment_path):
+    return segment_path + INDEX_SUFFIX
+
+
+def _line_offsets(data):
+    offsets = array("I", [0])
+    offsets.extend(m.end() for m in NEWLINE_RE.finditer(data))
+    if offsets[-1] != len(data):
+        offsets.append(len(data))
+    return offsets
+
+
+def _block_offsets(data):
+    offsets = [0]
+    while offsets[-1] < len(data):
+        cut = data.find(b"\n", offsets[-1] + BLOCK_SIZE - 1)
+        offsets.append(len(data) if cut < 0 else cut + 1)
+    return offsets
+
+
+def build_segment_index(segment_path):
+    with open(segment_path, "rb") as f:
+        data = f.read()
+    lower = data.lower()
+    line_offsets = _line_offsets(data)
+    block_offsets = _block_offsets(data)
+
+    # Trigrams are taken from distinct word tokens only; keyword trigrams that
+    # cross a non-word byte are simply not used for filtering.
+    token_masks = {}
+    for block, (start, end) in enumerate(zip(block_offsets, block_offsets[1:])):
+        bit = 1 << block
+        for token in set(TOKEN_RE.findall(lower, start, end)):
+            token_masks[token] = token_masks.get(token, 0) | bit
+    masks = {}
+    for token, mask in token_masks.items():
+        for i in range(len(token) - 2):
+            gram = token[i:i + 3]
+            masks[gram] = masks.get(gram, 0) | mask
+
+    grams = sorted(masks)
+    mask_bytes = max(1, (len(block_offsets) - 1 + 7) // 8)
+    header = {
+        "segment_size": len(data),
+        "block_offsets": block_offsets,
+        "line_count": len(line_offsets) - 1,
+        "trigram_count": len(grams),
+        "mask_bytes": mask_bytes,
+    }
+    body = [line_offsets.tobytes(), b"".join(grams),
+            b"".join(masks[g].to_bytes(mask_bytes, "little") for g in grams)]
+    return write_sidecar(index_path(segment_path), INDEX_MAGIC, header, body)
+
+
+def update_index_header(segment_path, **fields):
+    with open(index_path(segment_path), "rb") as f:
+        header, body = split_sidecar(f.read(), INDEX_MAGIC)
+    header.update(fields)
+    return write_sidecar(index_path(segment_path), INDEX_MAGIC, header, [body])
+
+
+class SegmentIndex:
+    def __init__(self, raw):
+        header, raw = split_sidecar(raw, INDEX_MAGIC)
+        pos = 0
+
+        self.segment_size = header["segment_size"]
+        self.block_offsets = header["block_offsets"]
+        # Set once the segment is compressed: gzip member offsets per block.
+        self.compressed_offsets = header.get("compressed_offsets")
+        self.compressed_size = header.get("compressed_size")
+        self.mask_bytes = header["mask_bytes"]
+        self.line_offsets = array("I")
+        line_bytes = (header["line_count"] + 1) * self.line_offsets.itemsize
+        self.line_offsets.frombytes(raw[pos:pos + line_bytes])
+        pos += line_bytes
+        self._trigram_count = header["trigram_count"]
+        self._grams = raw[pos:pos + 3 * self._trigram_count]
+        pos += 3 * self._trigram_count
+        self._masks = raw[pos:pos + self.mask_bytes * self._trigram_count]
+
+    @property
+    def block_count(self):
+        return len(self.block_offsets) - 1
+
+    @property
+    def line_count(self):
+        return len(self.line_offsets) - 1
+
+    def mask_for(self, gram):
+        lo, hi = 0, self._trigram_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            probe = self._grams[mid * 3:mid * 3 + 3]
+            if probe < gram:
+                lo = mid + 1
+            elif probe > gram:
+                hi = mid
+            else:
+                return int.from_bytes(self._masks[mid * self.mask_bytes:(mid + 1) * self.mask_bytes], "little")
+        return 0
+
+    def line_no(self, offset):
+        return bisect.bisect_right(self.line_offsets, offset) - 1
+
+    def candidate_ranges(self, matcher):
+        mask = matcher.candidate_mask(self)
+        ranges = []
+        for block in range(self.block_count):
+            if not mask >> block & 1:
+                continue
+            start, end = self.block_offsets[block], self.block_offsets[block + 1]
+            if ranges and ranges[-1][1] == start:
+                ranges[-1] = (ranges[-1][0], end)
+            else:
+                ranges.append((start, end))
+        return ranges
+
+
+def load_index(segment_path):
+    path = index_path(segment_path)
+    storage = storage_path(segment_path)
+    if storage is None:
+        return None
+    try:
+        storage_size = os.path.getsize(storage)
+        index_mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    key = (index_mtime, storage, storage_size)
+    with _cache_lock:
+        cached = _cache.get(path)
+        if cached is not None and cached[0] == key:
+            _cache.move_to_end(path)
+            return cached[1]
+    try:
+        with open(path, "rb") as f:
+            index = SegmentIndex(f.read())
+    except (OSError, ValueError, struct.error) as e:
+        print(f"[Index] Ignoring unreadable index {path}: {e}")
+        return None
+    expected_size = index.compressed_size if is_compressed(storage) else index.segment_size
+    if expected_size != storage_size:
+        # The segment grew (or was recompressed) after it was indexed; treat it as unindexed.
+        return None
+    with _cache_lock:
+        _cache[path] = (key, index)
+        while len(_cache) > INDEX_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return index
+
+
+# ---------------- MATCHING ----------------
+class KeywordMatcher:
+    def __init__(self, keywords):
+        encoded = sorted({kw.encode("utf-8") for kw in keywords if kw}, key=len, reverse=True)
+        if not encoded:
+            raise ValueError("at least one keyword is required")
+        self.keywords = list(keywords)
+        # One alternation over the lowered keywords instead of a substring test per
+        # keyword; it runs against ASCII-lowered text (see search_segment).
+        lowered = sorted({kw.lower() for kw in encoded}, key=len, reverse=True)
+        self.pattern = re.compile(b"|".join(re.escape(kw) for kw in lowered))
+        self._keyword_grams = []
+        for low in lowered:
+            self._keyword_grams.append({
+                low[i:i + 3] for i in range(len(low) - 2)
+                if all(b in WORD_BYTES for b in low[i:i + 3])
+            })
+
+    def candidate_mask(self, index):
+        full = (1 << index.block_count) - 1
+        result = 0
+        for grams in self._keyword_grams:
+            if not grams:
+                return full
+            mask = full
+            for gram in grams:
+                mask &= index.mask_for(gram)
+                if not mask:
+                    break
+            result |= mask
+        return result
+
+
+def search_segment(segment_path, matcher, index=None):
+    ranges = index.candidate_ranges(matcher) if index is not None else None
+    search = matcher.pattern.search
+    for base, buf in range_buffers(segment_path, index, ranges):
+        # ASCII lowering keeps byte offsets, so a case-sensitive pass over the
+        # lowered buffer maps straight back onto the raw segment.
+        low = buf.lower()
+        pos = 0
+        while True:
+            m = search(low, pos)
+            if not m:
+                break
+            line_start = low.rfind(b"\n", 0, m.start()) + 1
+            line_end = low.find(b"\n", m.end())
+            line_end = len(low) if line_end < 0 else line_end + 1
+            line_no = index.line_no(base + line_start) if index is not None else None
+            yield LineHit(segment_path, line_no, base + line_start, base + line_end, buf[line_start:line_end])
+            pos = line_end
+
+
+def is_closed_segment(segment_paths, i):
+    # Segments are listed in order per directory; the last one of each
+    # directory may still be growing.
+    return i + 1 < len(segment_paths) and \
+        os.path.dirname(segment_paths[i + 1]) == os.path.dirname(segment_paths[i])
+
+
+def search_segments(segment_paths, matcher, indexer=None):
+    # indexer: a segment_compressor.SegmentCompressor. It is the only writer of
+    # .idx files for closed segments, so a lazily built index can never replace
+    # one that already carries the compressed block table.
+    for i, path in enumerate(segment_paths):
+        index = load_index(path)
+        if index is None and indexer is not None and is_closed_segment(segment_paths, i) and storage_path(path) == path:
+            # Older segment without a fresh index: scan it now, index (and compress) it for next time.
+            indexer.submit(path)
+        yield from search_segment(path, matcher, index)
+
+
+# ---------------- CATALOG ----------------
+# logs/<date>/<tester>/<hour>/<feature>/<platform>/log_<tester>_<feature>_N.txt
+def _subdirs(path):
+    try:
+        return sorted(e.name for e in os.scandir(path) if e.is_dir())
+    except OSError:
+        return []
+
+
+def catalog_entries(logs_root="logs"):
+    for date_str in _subdirs(logs_root):
+        for tester in _subdirs(os.path.join(logs_root, date_str)):
+            for hour in _subdirs(os.path.join(logs_root, date_str, tester)):
+                for feature in _subdirs(os.path.join(logs_root, date_str, tester, hour)):
+                    feature_dir = os.path.join(logs_root, date_str, tester, hour, feature)
+                    for platform in _subdirs(feature_dir):
+                        yield date_str, tester, hour, feature, platform, os.path.join(feature_dir, platform)
+
+
+def list_segments(log_dir, tester, feature):
+    # Compressed segments ("*.txt.gz") are listed under their plain name.
+    name_re = re.compile(rf"log_{re.escape(tester)}_{re.escape(feature)}_(\d+)\.txt(?:\.gz)?$")
+    segments = {}
+    try:
+        names = os.listdir(log_dir)
+    except OSError:
+        return []
+    for name in names:
+        m = name_re.match(name)
+        if m:
+            segments[int(m.group(1))] = os.path.join(log_dir, f"log_{tester}_{feature}_{m.group(1)}.txt")
+    return [segments[n] for n in sorted(segments)]
+
+
+def session_segments(date_str, tester, feature, platform, logs_root="logs"):
+    # Per-device sessions write to <platform>/<serial>/, single captures to <platform>/.
+    segments = []
+    for hour in _subdirs(os.path.join(logs_root, date_str, tester)):
+        log_dir = os.path.join(logs_root, date_str, tester, hour, feature, platform.lower())
+        segments.extend(list_segments(log_dir, tester, feature))
+        for serial_dir in _subdirs(log_dir):
+            segments.extend(list_segments(os.path.join(log_dir, serial_dir), tester, feature))
+    return segments
@@ -0,0 +1,295 @@
+import queue
+import re
+import threading
+import tkinter as tk
+from array import array
+
+from log_index import load_index, search_segments
+from logcat_columns import filter_segments
+from segment_store import SegmentReader
+
+# ---------------- SEARCH RESULTS ----------------
+# Matches are kept as (segment, offset, length) triples in flat arrays; line
+# text is only read back for the rows on screen or while streaming a download.
+
+RESULT_BATCH = 1000
+DOWNLOAD_CHUNK_LINES = 5000
+
+
+class SearchResults:
+    # matcher and/or query (a logcat_columns.ColumnQuery); with a query the
+    # segments' column files drive the search and keywords filter what's left.
+    def __init__(self, segments, matcher, indexer=None, query=None):
+        self.segments = list(segments)
+        self.matcher = matcher
+        self.indexer = indexer
+        self.query = query
+        self.done = False
+        self.cancelled = False
+        self.error = None
+        self._segment_ids = {path: i for i, path in enumerate(self.segments)}
+        self._segment = array("I")
+        self._start = array("I")
+        self._length = array("I")
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._start)
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+        return self
+
+    def cancel(self):
+        self.cancelled = True
+
+    def _run(self):
+        segment, start, length = array("I"), array("I"), array("I")
+        if self.query is not None:
+            hits = filter_segments(self.segments, self.query, self.matcher)
+        else:
+            hits = search_segments(self.segments, self.matcher, self.indexer)
+        try:
+            for hit in hits:
+                if self.cancelled:
+                    break
+                segment.append(self._segment_ids[hit.path])
+                start.append(hit.start)
+                length.append(hit.end - hit.start)
+                if len(start) >= RESULT_BATCH:
+                    self._publish(segment, start, length)
+                    segment, start, length = array("I"), array("I"), array("I")
+            self._publish(segment, start, length)
+        except Exception as e:
+            print(f"[Viewer] Search failed: {e}")
+            self.error = e
+        finally:
+            hits.close()
+            self.done = True
+
+    def _publish(self, segment, start, length):
+        with self._lock:
+            self._segment.extend(segment)
+            self._start.extend(start)
+            self._length.extend(length)
+
+    def read_lines(self, first, count):
+        with self._lock:
+            last = min(first + count, len(self._start))
+            rows = [(self._segment[i], self._start[i], self._length[i]) for i in range(first, last)]
+        lines = []
+        readers = {}
+        try:
+            for segment, start, length in rows:
+                reader = readers.get(segment)
+                if reader is None:
+                    path = self.segments[segment]
+                    reader = readers[segment] = SegmentReader(path, load_index(path))
+                lines.append(reader.read(start, length))
+        finally:
+            for reader in readers.values():
+                reader.close()
+        return lines
+
+    def write_to(self, save_path):
+        with open(save_path, "wb") as out:
+            for first in range(0, len(self), DOWNLOAD_CHUNK_LINES):
+                out.writelines(self.read_lines(first, DOWNLOAD_CHUNK_LINES))
+
+
+def run_in_background(widget, func, on_done, poll_ms=100):
+    # Runs func on a worker thread and calls on_done(result, error) back on the Tk thread.
+    outcome = {}
+
+    def worker():
+        try:
+            outcome["result"] = func()
+        except Exception as e:
+            outcome["error"] = e
+
+    def poll():
+        if thread.is_alive():
+            widget.after(poll_ms, poll)
+        else:
+            on_done(outcome.get("result"), outcome.get("error"))
+
+    thread = threading.Thread(target=worker, daemon=True)
+    thread.start()
+    widget.after(poll_ms, poll)
+
+
+# ---------------- VIRTUAL VIEW ----------------
+# Only WINDOW_LINES rows around the scroll position live in the Text widget.
+# Rows and their highlight spans are prepared on a loader thread and inserted
+# in RENDER_BATCH_LINES chunks from the Tk loop.
+
+WINDOW_LINES = 300
+RENDER_BATCH_LINES = 100
+POLL_INTERVAL_MS = 50
+
+
+class VirtualLogView(tk.Frame):
+    def __init__(self, master, width=100, height=25, **kwargs):
+        super().__init__(master, **kwargs)
+        self.visible_lines = height
+        self.status_label = tk.Label(self, text="", anchor="w", font=("Arial", 10))
+        self.status_label.pack(side="bottom", fill="x")
+        self._status_fg = self.status_label.cget("fg")
+        self.scrollbar = tk.Scrollbar(self, command=self._on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y")
+        self.text = tk.Text(self, width=width, height=height, wrap="none", state="disabled")
+        self.text.pack(side="left", fill="both", expand=True)
+        self.text.bind("<MouseWheel>", lambda e: self._scroll_by(-1 if e.delta > 0 else 1, 3))
+        self.text.bind("<Button-4>", lambda e: self._scroll_by(-1, 3))
+        self.text.bind("<Button-5>", lambda e: self._scroll_by(1, 3))
+
+        self.results = None
+        self.on_done = None
+        self.top = 0
+        self._patterns = []
+        self._window_first = 0
+        self._window_count = 0
+        self._generation = 0
+        self._loading = False
+        self._user_scrolled = False
+        self._polling = False
+        self._rows = queue.Queue()
+
+    def show_results(self, results, keywords, on_done=None):
+        self.results = results
+        self.on_done = on_done
+        self._patterns = [(kw, re.compile(re.escape(kw), re.IGNORECASE)) for kw in keywords]
+        self.top = 0
+        self._window_first = 0
+        self._window_count = 0
+        self._generation += 1
+        self._loading = False
+        self._user_scrolled = False
+        self._clear_text()
+        self._ensure_polling()
+
+    # ---------------- SCROLLING ----------------
+    def _on_scrollbar(self, action, amount, unit=None):
+        if self.results is None:
+            return
+        if action == "moveto":
+            self._scroll_to(int(float(amount) * len(self.results)))
+        elif action == "scroll":
+            self._scroll_by(int(amount), self.visible_lines if unit == "pages" else 1)
+
+    def _scroll_by(self, direction, step):
+        if self.results is not None:
+            self._scroll_to(self.top + direction * step)
+        return "break"
+
+    def _scroll_to(self, top):
+        self._user_scrolled = True
+        self._show(top)
+
+    def _show(self, top):
+        total = len(self.results)
+        self.top = max(0, min(top, total - self.visible_lines))
+        self._update_scrollbar(total)
+        window_end = self._window_first + self._window_count
+        wanted_end = min(self.top + self.visible_lines, total)
+        if self._window_first <= self.top and wanted_end <= window_end and not self._loading:
+            self.text.yview(f"{self.top - self._window_first + 1}.0")
+        else:
+            self._request_window()
+
+    def _update_scrollbar(self, total):
+        if total <= 0:
+            self.scrollbar.set(0.0, 1.0)
+        else:
+            self.scrollbar.set(self.top / total, min(1.0, (self.top + self.visible_lines) / total))
+
+    # ---------------- LOADING ----------------
+    def _request_window(self):
+        if self._loading:
+            # The in-flight load re-checks self.top when it lands.
+            return
+        self._loading = True
+        self._generation += 1
+        first = max(0, self.top - (WINDOW_LINES - self.visible_lines) // 2)
+        threading.Thread(target=self._load_window,
+                         args=(self._generation, self.results, first), daemon=True).start()
+        self._ensure_polling()
+
+    def _load_window(self, generation, results, first):
+        rows = []
+        try:
+            for raw in results.read_lines(first, WINDOW_LINES):
+                line = raw.decode("utf-8", errors="replace").rstrip("\r\n") + "\n"
+                spans = [(kw, m.start(), m.end()) for kw, pattern in self._patterns
+                         for m in pattern.finditer(line)]
+                rows.append((line, spans))
+        except Exception as e:
+            print(f"[Viewer] Failed to load rows: {e}")
+        self._rows.put((generation, first, rows))
+
+    def _ensure_polling(self):
+        if not self._polling:
+            self._polling = True
+            self.after(POLL_INTERVAL_MS, self._poll)
+
+    def _poll(self):
+        if not self.winfo_exists():
+            return
+        while True:
+            try:
+                generation, first, rows = self._rows.get_nowait()
+            except queue.Empty:
+                break
+            if generation == self._generation:
+                self._clear_text()
+                self._window_first = first
+                self._window_count = 0
+                self._render_batch(generation, rows, 0)
+
+        results = self.results
+        if results is not None:
+            total = len(results)
+            self._update_scrollbar(total)
+            if results.error is not None:
+                self.status_label.config(text=f"Search failed after {total} matching lines: {results.error}",
+                                         fg="#c0392b")
+            else:
+                state = "Searching... " if not results.done else ""
+                self.status_label.config(text=f"{state}{total} matching lines", fg=self._status_fg)
+            if not self._loading and self._window_count < WINDOW_LINES and \
+                    self._window_first + self._window_count < total:
+                self._request_window()
+            if results.done and self.on_done is not None:
+                on_done, self.on_done = self.on_done, None
+                if not self._user_scrolled:
+                    self._show(total)
+                # on_done only reports a complete search: partial results must not be downloaded.
+                if results.error is None:
+                    on_done()
+        if self._loading or (results is not None and not results.done):
+            self.after(POLL_INTERVAL_MS, self._poll)
+        else:
+            self._polling = False
+
+    def _render_batch(self, generation, rows, offset):
+        if generation != self._generation or not self.winfo_exists():
+            return
+        batch = rows[offset:offset + RENDER_BATCH_LINES]
+        self.text.config(state="normal")
+        row_no = self._window_count + 1
+        self.text.insert(tk.END, "".join(line for line, _ in batch))
+        for i, (_, spans) in enumerate(batch):
+            for kw, start, end in spans:
+                self.text.tag_add(kw, f"{row_no + i}.{start}", f"{row_no + i}.{end}")
+        self.text.config(state="disabled")
+        self._window_count += len(batch)
+        if offset + RENDER_BATCH_LINES < len(rows):
+            self.after(1, lambda: self._render_batch(generation, rows, offset + RENDER_BATCH_LINES))
+        else:
+            self._loading = False
+            self._show(self.top)
+
+    def _clear_text(self):
+        self.text.config(state="normal")
+        self.text.delete("1.0", tk.END)
+        self.text.config(state="disabled")
@@ -0,0 +1,252 @@
+import os
+import re
+import struct
+from array import array
+from collections import namedtuple
+
+from log_index import LineHit, is_closed_segment, load_index
+from segment_store import (SegmentReader, encode_sidecar, is_compressed, range_buffers, split_sidecar, storage_path,
+                           write_sidecar)
+
+# ---------------- LOGCAT COLUMN STORE ----------------
+# Optional capture stage that parses threadtime lines
+#   09-08 15:48:04.593  1734  2957 D SemNscXgbL2Nrt: message
+# into per-segment column arrays kept in a "<segment>.cols" sidecar:
+# line offset/length, packed timestamp, pid, tid, level, interned tag id and
+# the message offset within the line. Rows are grouped in zones with min/max
+# timestamps so time-range queries skip whole zones.
+
+COLUMNS_SUFFIX = ".cols"
+COLUMNS_MAGIC = b"LCCOL01\n"
+ZONE_ROWS = 1024
+
+THREADTIME_RE = re.compile(
+    rb"^(\d\d)-(\d\d) (\d\d):(\d\d):(\d\d)\.(\d\d\d)\s+(\d+)\s+(\d+) ([VDIWEFAS]) (.*?)\s*: ",
+    re.MULTILINE,
+)
+LEVELS = {"V": 2, "D": 3, "I": 4, "W": 5, "E": 6, "F": 7, "A": 7, "S": 8}
+_LEVEL_BYTES = {ord(k): v for k, v in LEVELS.items()}
+
+# (name, array typecode) in file order
+COLUMNS = [
+    ("offset", "I"),
+    ("length", "I"),
+    ("ts", "q"),
+    ("pid", "I"),
+    ("tid", "I"),
+    ("level", "B"),
+    ("tag", "I"),
+    ("msg", "H"),
+]
+
+ColumnQuery = namedtuple("ColumnQuery", "min_level tags pids start_ts end_ts")
+ColumnQuery.__new__.__defaults__ = (None, None, None, None, None)
+
+
+def columns_path(segment_path):
+    return segment_path + COLUMNS_SUFFIX
+
+
+def pack_timestamp(month, day, hour, minute, second, millis=0):
+    # threadtime has no year; ordering within a year is all the queries need.
+    return (((((month - 1) * 31 + day - 1) * 24 + hour) * 60 + minute) * 60 + second) * 1000 + millis
+
+
+class ColumnBuilder:
+    def __init__(self):
+        self.columns = {name: array(code) for name, code in COLUMNS}
+        self.tags = []
+        self._tag_ids = {}
+        self.size = 0
+
+    def feed(self, data, base, pos=0, endpos=None):
+        # data[pos:endpos] holds whole lines starting at raw offset `base` of the segment.
+        if endpos is None:
+            endpos = len(data)
+        c = self.columns
+        offset, length, ts, pid, tid = c["offset"], c["length"], c["ts"], c["pid"], c["tid"]
+        level, tag, msg = c["level"], c["tag"], c["msg"]
+        tag_ids = self._tag_ids
+        find = data.find
+        shift = base - pos
+        for m in THREADTIME_RE.finditer(data, pos, endpos):
+            start = m.start()
+            end = find(b"\n", m.end(), endpos)
+            end = endpos if end < 0 else end + 1
+            mo, dd, hh, mi, ss, ms, p, t, lv, tg = m.groups()
+            offset.append(shift + start)
+            length.append(end - start)
+            ts.append((((((int(mo) - 1) * 31 + int(dd) - 1) * 24 + int(hh)) * 60 + int(mi)) * 60 + int(ss))
+                      * 1000 + int(ms))
+            pid.append(int(p))
+            tid.append(int(t))
+            level.append(_LEVEL_BYTES[lv[0]])
+            tag_id = tag_ids.get(tg)
+            if tag_id is None:
+                tag_id = tag_ids[tg] = len(self.tags)
+                self.tags.append(tg)
+            tag.append(tag_id)
+            msg.append(min(m.end() - start, 0xFFFF))
+        self.size = max(self.size, base + endpos - pos)
+
+    def encode(self):
+        ts = self.columns["ts"]
+        zones = [(min(ts[i:i + ZONE_ROWS]), max(ts[i:i + ZONE_ROWS])) for i in range(0, len(ts), ZONE_ROWS)]
+        header = {
+            "rows": len(ts),
+            "segment_size": self.size,
+            "tags": [t.decode("utf-8", errors="replace") for t in self.tags],
+            "zone_rows": ZONE_ROWS,
+            "zones": zones,
+        }
+        return header, [self.columns[name].tobytes() for name, _ in COLUMNS]
+
+    def write(self, segment_path):
+        header, body = self.encode()
+        return write_sidecar(columns_path(segment_path), COLUMNS_MAGIC, header, body)
+
+
+class ColumnStage:
+    # Plugged into CaptureWriter: sees every byte written to each segment.
+    def __init__(self):
+        self._builder = None
+
+    def segment_opened(self, segment_path, size):
+        self._builder = ColumnBuilder()
+        self._builder.size = size
+
+    def feed(self, data, base, pos, endpos):
+        self._builder.feed(data, base, pos, endpos)
+
+    def segment_closed(self, segment_path):
+        if self._builder is not None and self._builder.size:
+            self._builder.write(segment_path)
+        self._builder = None
+
+
+def _parse_segment(segment_path):
+    builder = ColumnBuilder()
+    for base, buf in range_buffers(segment_path, load_index(segment_path)):
+        builder.feed(buf, base)
+    return builder
+
+
+def build_segment_columns(segment_path):
+    return _parse_segment(segment_path).write(segment_path)
+
+
+# ---------------- QUERIES ----------------
+class ColumnSegment:
+    def __init__(self, raw):
+        header, raw = split_sidecar(raw, COLUMNS_MAGIC)
+        pos = 0
+        self.rows = header["rows"]
+        self.segment_size = header["segment_size"]
+        self.tags = header["tags"]
+        self.zone_rows = header["zone_rows"]
+        self.zones = header["zones"]
+        for name, code in COLUMNS:
+            column = array(code)
+            size = self.rows * column.itemsize
+            column.frombytes(raw[pos:pos + size])
+            pos += size
+            setattr(self, name, column)
+        self.level_bytes = self.level.tobytes()
+
+    def select(self, query):
+        # Row numbers matching every set field of the query, in file order.
+        tag_ids = None
+        if query.tags:
+            wanted = {t.lower() for t in query.tags}
+            tag_ids = {i for i, t in enumerate(self.tags) if t.lower() in wanted}
+            if not tag_ids:
+                return []
+        level_mask = None
+        if query.min_level:
+            level_mask = bytes(1 if i >= query.min_level else 0 for i in range(256))
+        pids = set(query.pids) if query.pids else None
+        start_ts, end_ts = query.start_ts, query.end_ts
+
+        rows = []
+        for zone, (zone_min, zone_max) in enumerate(self.zones):
+            if (start_ts is not None and zone_max < start_ts) or (end_ts is not None and zone_min > end_ts):
+                continue
+            first = zone * self.zone_rows
+            last = min(first + self.zone_rows, self.rows)
+            if level_mask is not None:
+                # Level is a byte column: translate to a 0/1 mask and let find() skip rows.
+                mask = self.level_bytes[first:last].translate(level_mask)
+                candidates = []
+                i = mask.find(1)
+                while i >= 0:
+                    candidates.append(first + i)
+                    i = mask.find(1, i + 1)
+            else:
+                candidates = range(first, last)
+            if tag_ids is not None:
+                tag = self.tag
+                candidates = [i for i in candidates if tag[i] in tag_ids]
+            if pids is not None:
+                pid = self.pid
+                candidates = [i for i in candidates if pid[i] in pids]
+            if start_ts is not None or end_ts is not None:
+                ts = self.ts
+                lo = start_ts if start_ts is not None else -1
+                hi = end_ts if end_ts is not None else 1 << 62
+                # Zones wholly inside the range need no per-row check.
+                if zone_min < lo or zone_max > hi:
+                    candidates = [i for i in candidates if lo <= ts[i] <= hi]
+            rows.extend(candidates)
+        return rows
+
+
+def load_columns(segment_path, build_missing=False):
+    path = columns_path(segment_path)
+    storage = storage_path(segment_path)
+    if storage is None:
+        return None
+    if not os.path.exists(path):
+        if not build_missing:
+            return None
+        build_segment_columns(segment_path)
+    try:
+        with open(path, "rb") as f:
+            columns = ColumnSegment(f.read())
+    except (OSError, ValueError, struct.error) as e:
+        print(f"[Columns] Ignoring unreadable column file {path}: {e}")
+        return None
+    if not is_compressed(storage) and os.path.getsize(storage) != columns.segment_size:
+        if not build_missing:
+            return None
+        build_segment_columns(segment_path)
+        return load_columns(segment_path)
+    return columns
+
+
+def filter_segments(segment_paths, query, matcher=None):
+    # Yields LineHits for lines matching `query` and, when given, the keyword matcher.
+    for i, path in enumerate(segment_paths):
+        # A segment that may still be growing is parsed in memory instead of
+        # saving columns that would go stale.
+        columns = load_columns(path, build_missing=is_closed_segment(segment_paths, i))
+        if columns is None:
+            if storage_path(path) is None:
+                continue
+            columns = ColumnSegment(encode_sidecar(COLUMNS_MAGIC, *_parse_segment(path).encode()))
+        rows = columns.select(query)
+        if not rows:
+            continue
+        index = load_index(path)
+        search = matcher.pattern.search if matcher is not None else None
+        offsets, lengths = columns.offset, columns.length
+        reader = SegmentReader(path, index)
+        try:
+            for row in rows:
+                start, length = offsets[row], lengths[row]
+                line = reader.read(start, length)
+                if search is not None and not search(line.lower()):
+                    continue
+                line_no = index.line_no(start) if index is not None else None
+                yield LineHit(path, line_no, start, start + length, line)
+        finally:
+            reader.close()
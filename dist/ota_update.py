@@ -0,0 +1,264 @@
+import hashlib
+import http.client
+import json
+import os
+import re
+import shutil
+import threading
+import urllib.error
+import urllib.request
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+# ---------------- OTA UPDATES ----------------
+# Manifest v2 lists every shipped file with its sha256 and size, and the file
+# bodies are published content-addressed as <files_url>/<sha256>. A client
+# only downloads files whose hash differs from the installed copy, hashes them
+# while they download, resumes interrupted downloads with HTTP Range requests
+# and installs each file with an atomic rename once everything is verified.
+# v1 manifests (one zip for the whole tree) go through the same download and
+# install steps.
+
+MANIFEST_FORMAT = 2
+DOWNLOAD_WORKERS = 4
+DOWNLOAD_RETRIES = 3
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+HTTP_TIMEOUT = 15
+STAGING_DIR = ".ota_staging"
+MANIFEST_CACHE = ".ota_manifest_cache.json"
+INSTALLED_MANIFEST = ".ota_installed.json"
+
+
+def parse_version(version):
+    return tuple(int(p) for p in re.findall(r"\d+", version))
+
+
+def is_newer(latest, current):
+    return parse_version(latest) > parse_version(current)
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _write_json(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def fetch_manifest(url, cache_path=MANIFEST_CACHE):
+    # Conditional GET: an unchanged manifest costs a 304 and no body.
+    cached = None
+    try:
+        with open(cache_path) as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        pass
+    request = urllib.request.Request(url, headers={"Cache-Control": "no-cache"})
+    if cached and cached.get("url") == url and cached.get("etag"):
+        request.add_header("If-None-Match", cached["etag"])
+    try:
+        with urllib.request.urlopen(request, timeout=HTTP_TIMEOUT) as resp:
+            manifest = json.load(resp)
+            etag = resp.headers.get("ETag")
+    except urllib.error.HTTPError as e:
+        if e.code == 304 and cached:
+            return cached["manifest"]
+        raise
+    if etag:
+        try:
+            _write_json(cache_path, {"url": url, "etag": etag, "manifest": manifest})
+        except OSError as e:
+            print(f"[OTA] Could not cache manifest: {e}")
+    return manifest
+
+
+class UpdateProgress:
+    # Shared between download threads and the Tk thread that draws it.
+    def __init__(self):
+        self.total = 0
+        self.done = 0
+        self.downloaded = 0
+        self._lock = threading.Lock()
+
+    def add(self, n, downloaded=True):
+        with self._lock:
+            self.done += n
+            if downloaded:
+                self.downloaded += n
+
+
+def download_file(url, dest, sha256, size, progress=None):
+    # Downloads into dest + ".part", picking up where an earlier attempt
+    # stopped, and renames it to dest once size and hash match.
+    progress = progress or UpdateProgress()
+    part_path = dest + ".part"
+    if os.path.exists(dest) and os.path.getsize(dest) == size and file_sha256(dest) == sha256:
+        progress.add(size, downloaded=False)
+        return dest
+
+    for attempt in range(DOWNLOAD_RETRIES):
+        h = hashlib.sha256()
+        have = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        if have > size:
+            os.remove(part_path)
+            have = 0
+        if have:
+            with open(part_path, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    h.update(chunk)
+            progress.add(have, downloaded=False)
+
+        request = urllib.request.Request(url)
+        if have:
+            request.add_header("Range", f"bytes={have}-")
+        try:
+            if have < size:
+                with urllib.request.urlopen(request, timeout=HTTP_TIMEOUT) as resp:
+                    mode = "ab"
+                    if have and resp.status != 206:
+                        # Server ignored the range: start over.
+                        progress.add(-have, downloaded=False)
+                        h, have, mode = hashlib.sha256(), 0, "wb"
+                    with open(part_path, mode) as f:
+                        for chunk in iter(lambda: resp.read(DOWNLOAD_CHUNK_SIZE), b""):
+                            f.write(chunk)
+                            h.update(chunk)
+                            have += len(chunk)
+                            progress.add(len(chunk))
+            if have < size:
+                raise http.client.IncompleteRead(b"", size - have)
+        except (OSError, http.client.HTTPException) as e:
+            # Connection dropped: keep the part file and resume from it.
+            print(f"[OTA] Download of {url} interrupted at {have} bytes (attempt {attempt + 1}): {e!r}")
+            progress.add(-have, downloaded=False)
+            continue
+
+        # Zero-byte files have nothing to download, so no part file was written.
+        open(part_path, "ab").close()
+        if have != size or h.hexdigest() != sha256:
+            os.remove(part_path)
+            raise ValueError(f"Checksum mismatch for {url}")
+        os.replace(part_path, dest)
+        return dest
+    raise IOError(f"Download of {url} failed after {DOWNLOAD_RETRIES} attempts")
+
+
+def _target_path(install_dir, name):
+    return os.path.join(install_dir, *name.split("/"))
+
+
+def plan_update(manifest, install_dir):
+    # Names of manifest files whose installed copy is missing or different.
+    changed = []
+    for name, entry in sorted(manifest["files"].items()):
+        path = _target_path(install_dir, name)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = None
+        if size != entry["size"] or file_sha256(path) != entry["sha256"]:
+            changed.append(name)
+    return changed
+
+
+def _replace(src, dst):
+    try:
+        os.replace(src, dst)
+    except PermissionError:
+        # Windows won't overwrite a loaded DLL/EXE but will rename it.
+        old = dst + ".old"
+        if os.path.exists(old):
+            os.remove(old)
+        os.replace(dst, old)
+        os.replace(src, dst)
+
+
+def _install(sources, install_dir):
+    # sources: {name: staged path}. Each target is swapped in with a rename
+    # from a copy in its own directory, so a file is never half written.
+    for name, staged in sorted(sources.items()):
+        target = _target_path(install_dir, name)
+        os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+        tmp_path = target + ".ota_new"
+        shutil.copyfile(staged, tmp_path)
+        _replace(tmp_path, target)
+
+
+def _remove_stale(install_dir, files):
+    # Drops files the previous release installed and this one no longer ships.
+    try:
+        with open(os.path.join(install_dir, INSTALLED_MANIFEST)) as f:
+            previous = json.load(f).get("files", {})
+    except (OSError, ValueError):
+        return
+    for name in previous:
+        if name not in files:
+            try:
+                os.remove(_target_path(install_dir, name))
+            except OSError:
+                pass
+
+
+def apply_update(manifest, install_dir, progress=None, workers=DOWNLOAD_WORKERS):
+    # Returns the number of bytes fetched over the network.
+    progress = progress or UpdateProgress()
+    staging = os.path.join(install_dir, STAGING_DIR)
+    os.makedirs(staging, exist_ok=True)
+    if manifest.get("format", 1) < MANIFEST_FORMAT or "files" not in manifest:
+        return _apply_zip_update(manifest, install_dir, staging, progress)
+
+    changed = plan_update(manifest, install_dir)
+    files_url = manifest["files_url"].rstrip("/") + "/"
+    objects = {manifest["files"][name]["sha256"]: manifest["files"][name]["size"] for name in changed}
+    if sum(objects.values()) > manifest.get("zip_size", float("inf")):
+        # Fresh installs and big releases: the compressed zip is smaller.
+        return _apply_zip_update(manifest, install_dir, staging, progress)
+    progress.total = sum(objects.values())
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(download_file, files_url + sha256, os.path.join(staging, sha256),
+                                   sha256, size, progress)
+                   for sha256, size in objects.items()]
+        for future in futures:
+            future.result()
+
+    _install({name: os.path.join(staging, manifest["files"][name]["sha256"]) for name in changed}, install_dir)
+    _finish_install(manifest, install_dir, staging)
+    print(f"[OTA] Installed {len(changed)} changed files, {progress.downloaded} bytes downloaded")
+    return progress.downloaded
+
+
+def _finish_install(manifest, install_dir, staging):
+    if "files" in manifest:
+        _remove_stale(install_dir, manifest["files"])
+        _write_json(os.path.join(install_dir, INSTALLED_MANIFEST),
+                    {"version": manifest["version"], "files": manifest["files"]})
+    shutil.rmtree(staging, ignore_errors=True)
+
+
+def _apply_zip_update(manifest, install_dir, staging, progress):
+    url = manifest["url"]
+    size = manifest.get("zip_size")
+    if size is None:
+        # v1 manifests don't publish the size; ask the server.
+        request = urllib.request.Request(url, method="HEAD")
+        with urllib.request.urlopen(request, timeout=HTTP_TIMEOUT) as resp:
+            size = int(resp.headers["Content-Length"])
+    progress.total = size
+    zip_path = download_file(url, os.path.join(staging, manifest["sha256"]), manifest["sha256"], size, progress)
+
+    extract_dir = os.path.join(staging, "extracted")
+    shutil.rmtree(extract_dir, ignore_errors=True)
+    with zipfile.ZipFile(zip_path) as zip_ref:
+        zip_ref.extractall(extract_dir)
+        names = [n for n in zip_ref.namelist() if not n.endswith("/")]
+    _install({name: os.path.join(extract_dir, *name.split("/")) for name in names}, install_dir)
+    _finish_install(manifest, install_dir, staging)
+    print(f"[OTA] Installed {len(names)} files from {url}, {progress.downloaded} bytes downloaded")
+    return progress.downloaded
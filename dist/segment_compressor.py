@@ -0,0 +1,126 @@
+import gzip
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from log_index import build_segment_index, catalog_entries, list_segments, load_index, update_index_header
+from segment_store import claim_segment, compressed_path, has_live_writer, temp_path
+
+# ---------------- BACKGROUND COMPRESSION ----------------
+# Closed segments are indexed and gzip-compressed in a low-priority worker
+# process. Each index block becomes its own gzip member (deflate only looks
+# back 32 KB, so 64 KB blocks cost little ratio) and the member offsets are
+# stored in the index, which is what makes the .gz seekable per block.
+
+COMPRESS_LEVEL = 6
+COMPRESS_WORKERS = 1
+POSIX_NICE = 15
+IDLE_PRIORITY_CLASS = 0x40
+
+
+def _lower_priority():
+    try:
+        if sys.platform == "win32":
+            import ctypes
+            kernel32 = ctypes.windll.kernel32
+            kernel32.SetPriorityClass(kernel32.GetCurrentProcess(), IDLE_PRIORITY_CLASS)
+        else:
+            os.nice(POSIX_NICE)
+    except Exception as e:
+        print(f"[Compress] Could not lower worker priority: {e}")
+
+
+def compress_segment(segment_path, level=COMPRESS_LEVEL):
+    # Returns (raw_bytes, compressed_bytes), or None if there is nothing to do
+    # or another process (a second app instance's sweep) is already on it.
+    if not os.path.exists(segment_path):
+        return None
+    claim = claim_segment(segment_path)
+    if claim is None:
+        return None
+    try:
+        return _compress_claimed(segment_path, level)
+    finally:
+        claim.release()
+
+
+def _compress_claimed(segment_path, level):
+    gz_path = compressed_path(segment_path)
+    if not os.path.exists(segment_path):
+        return None
+    index = load_index(segment_path)
+    if index is None:
+        build_segment_index(segment_path)
+        index = load_index(segment_path)
+
+    if not (index.compressed_offsets and os.path.exists(gz_path)
+            and os.path.getsize(gz_path) == index.compressed_size):
+        with open(segment_path, "rb") as f:
+            data = f.read()
+        if len(data) != index.segment_size:
+            build_segment_index(segment_path)
+            index = load_index(segment_path)
+        blocks = index.block_offsets
+        offsets = [0]
+        tmp_path = temp_path(gz_path)
+        with open(tmp_path, "wb") as out:
+            for start, end in zip(blocks, blocks[1:]):
+                member = gzip.compress(data[start:end], compresslevel=level, mtime=0)
+                out.write(member)
+                offsets.append(offsets[-1] + len(member))
+        os.replace(tmp_path, gz_path)
+        update_index_header(segment_path, compressed_offsets=offsets, compressed_size=offsets[-1])
+
+    raw_size = index.segment_size
+    try:
+        os.remove(segment_path)
+    except OSError as e:
+        # Typically still open in a viewer on Windows; the next sweep retries.
+        print(f"[Compress] Kept {segment_path} for now: {e}")
+    return raw_size, os.path.getsize(gz_path)
+
+
+class SegmentCompressor:
+    def __init__(self, workers=COMPRESS_WORKERS):
+        self._executor = ProcessPoolExecutor(max_workers=workers, initializer=_lower_priority)
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def submit(self, segment_path):
+        with self._lock:
+            if segment_path in self._pending:
+                return
+            self._pending.add(segment_path)
+        future = self._executor.submit(compress_segment, segment_path)
+        future.add_done_callback(lambda f: self._done(segment_path, f))
+
+    def _done(self, segment_path, future):
+        with self._lock:
+            self._pending.discard(segment_path)
+        try:
+            result = future.result()
+        except Exception as e:
+            print(f"[Compress] Failed to compress {segment_path}: {e}")
+            return
+        if result:
+            raw_size, gz_size = result
+            print(f"[Compress] {os.path.basename(segment_path)}: {raw_size} -> {gz_size} bytes")
+
+    def sweep(self, logs_root="logs"):
+        # Queues every plain-text segment left by earlier runs. Directories a
+        # writer (of this or another process) holds a lock in are left to that
+        # writer's own compressor. Writers always open a fresh segment number,
+        # so nothing listed in an unlocked directory is written to again.
+        for _, tester, _, feature, _, platform_dir in catalog_entries(logs_root):
+            dirs = [platform_dir] + [e.path for e in os.scandir(platform_dir) if e.is_dir()]
+            for log_dir in dirs:
+                if has_live_writer(log_dir):
+                    continue
+                for segment_path in list_segments(log_dir, tester, feature):
+                    if os.path.exists(segment_path):
+                        self.submit(segment_path)
+
+    def shutdown(self):
+        # Drops queued segments (the next sweep picks them up); waits for the running one.
+        self._executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,279 @@
+import bisect
+import gzip
+import itertools
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+import zlib
+
+# ---------------- SEGMENT STORAGE ----------------
+# A segment is addressed by its plain name (log_<tester>_<feature>_N.txt) and
+# stored either as that file or, once compressed, as "<name>.gz": a gzip
+# stream made of one independent member per index block. The member offsets
+# live in the segment index, so a reader can inflate single blocks; without
+# them the file is still an ordinary gzip stream that is read sequentially.
+
+COMPRESSED_SUFFIX = ".gz"
+STREAM_CHUNK_SIZE = 1024 * 1024
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+WRITER_LOCK_PREFIX = ".writer."
+WRITER_LOCK_SUFFIX = ".lock"
+CLAIM_SUFFIX = ".claim"
+LOCK_RETRY_DELAY = 0.01
+
+
+def compressed_path(segment_path):
+    return segment_path + COMPRESSED_SUFFIX
+
+
+def storage_path(segment_path):
+    if os.path.exists(segment_path):
+        return segment_path
+    path = compressed_path(segment_path)
+    if os.path.exists(path):
+        return path
+    return None
+
+
+def is_compressed(storage):
+    return storage.endswith(COMPRESSED_SUFFIX)
+
+
+# ---------------- SIDECAR FILES ----------------
+# Per-segment sidecars (.idx, .cols, .hits) share one layout: an 8-byte magic,
+# a u32 header length, a JSON header, then a binary body.
+
+def temp_path(path):
+    # Per process, so two app instances writing the same file never share one.
+    return f"{path}.{os.getpid()}.tmp"
+
+
+def encode_sidecar(magic, header, body_parts):
+    header = json.dumps(header).encode("utf-8")
+    return b"".join([magic, struct.pack("<I", len(header)), header, *body_parts])
+
+
+def write_sidecar(path, magic, header, body_parts):
+    tmp_path = temp_path(path)
+    with open(tmp_path, "wb") as f:
+        f.write(encode_sidecar(magic, header, body_parts))
+    os.replace(tmp_path, path)
+    return path
+
+
+def split_sidecar(raw, magic):
+    # (header, body); raises ValueError for anything else.
+    if raw[:len(magic)] != magic:
+        raise ValueError(f"not a {magic.strip().decode()} file")
+    pos = len(magic)
+    (header_len,) = struct.unpack_from("<I", raw, pos)
+    pos += 4
+    return json.loads(raw[pos:pos + header_len]), raw[pos + header_len:]
+
+
+# ---------------- WRITER LOCKS ----------------
+# A capture writer holds an OS lock on its own "<dir>/.writer.<pid>.<n>.lock"
+# for as long as it may append to a segment in <dir>, so other processes
+# (a second app instance, a headless run) can tell live directories apart.
+# The OS drops the lock with the process; a lock file left by a crashed run
+# can be locked again and is removed.
+
+def _is_file_at(f, path):
+    try:
+        return os.path.samestat(os.fstat(f.fileno()), os.stat(path))
+    except OSError:
+        return False
+
+
+def _try_lock(f):
+    try:
+        if sys.platform == "win32":
+            import msvcrt
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+class WriterLock:
+    _ids = itertools.count(1)
+
+    def __init__(self, log_dir):
+        name = f"{WRITER_LOCK_PREFIX}{os.getpid()}.{next(WriterLock._ids)}{WRITER_LOCK_SUFFIX}"
+        self.path = os.path.join(log_dir or ".", name)
+        # Between open() and the lock, has_live_writer() in another process can
+        # see the file unlocked and remove it as stale. Only a lock on the file
+        # that still sits at self.path counts; otherwise try again.
+        while True:
+            f = open(self.path, "wb")
+            if _try_lock(f) and _is_file_at(f, self.path):
+                self._file = f
+                return
+            f.close()
+            time.sleep(LOCK_RETRY_DELAY)
+
+    def release(self):
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class SegmentClaim:
+    # Held while one process rewrites a segment's storage (compression).
+    def __init__(self, path, f):
+        self.path = path
+        self._file = f
+
+    def release(self):
+        # Unlinked while still locked where the OS allows it, so a process that
+        # opened the old file fails its _is_file_at() check instead of winning.
+        try:
+            os.remove(self.path)
+            removed = True
+        except OSError:
+            removed = False
+        self._file.close()
+        if not removed:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+
+def claim_segment(segment_path):
+    # The claim, or None while another process holds it. Like writer locks it
+    # dies with its process, so a crash never leaves a segment claimed.
+    path = segment_path + CLAIM_SUFFIX
+    f = open(path, "ab")
+    if _try_lock(f) and _is_file_at(f, path):
+        return SegmentClaim(path, f)
+    f.close()
+    return None
+
+
+def has_live_writer(log_dir):
+    live = False
+    try:
+        names = os.listdir(log_dir)
+    except OSError:
+        return False
+    for name in names:
+        if not (name.startswith(WRITER_LOCK_PREFIX) and name.endswith(WRITER_LOCK_SUFFIX)):
+            continue
+        path = os.path.join(log_dir, name)
+        try:
+            f = open(path, "ab")
+        except OSError:
+            live = True
+            continue
+        with f:
+            locked = _try_lock(f)
+        if not locked:
+            live = True
+            continue
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    return live
+
+
+def _has_block_table(index):
+    return index is not None and index.compressed_offsets is not None
+
+
+def _read_blocks(f, index, first, last):
+    offsets = index.compressed_offsets
+    f.seek(offsets[first])
+    data = f.read(offsets[last + 1] - offsets[first])
+    base = offsets[first]
+    return b"".join(zlib.decompress(data[offsets[b] - base:offsets[b + 1] - base], GZIP_WBITS)
+                    for b in range(first, last + 1))
+
+
+def range_buffers(segment_path, index=None, ranges=None):
+    # Yields (raw_offset, bytes) pieces covering `ranges` (all of the segment
+    # when None). Every piece starts and ends on a line boundary.
+    storage = storage_path(segment_path)
+    if storage is None or os.path.getsize(storage) == 0:
+        return
+    if not is_compressed(storage):
+        with open(storage, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for start, end in ranges if ranges is not None else [(0, len(mm))]:
+                yield start, mm[start:end]
+        return
+
+    if _has_block_table(index):
+        blocks = index.block_offsets
+        if ranges is None:
+            ranges = [(0, blocks[-1])]
+        with open(storage, "rb") as f:
+            for start, end in ranges:
+                first = bisect.bisect_right(blocks, start) - 1
+                last = bisect.bisect_left(blocks, end) - 1
+                for block in range(first, last + 1):
+                    yield blocks[block], _read_blocks(f, index, block, block)
+        return
+
+    # No block table: inflate the whole stream in line-aligned chunks.
+    with gzip.open(storage, "rb") as f:
+        pos, tail = 0, b""
+        while True:
+            chunk = f.read(STREAM_CHUNK_SIZE)
+            if not chunk:
+                break
+            buf = tail + chunk
+            cut = buf.rfind(b"\n") + 1
+            if cut == 0:
+                tail = buf
+                continue
+            yield pos, buf[:cut]
+            pos += cut
+            tail = buf[cut:]
+        if tail:
+            yield pos, tail
+
+
+class SegmentReader:
+    # Random access by raw offset, whether or not the segment is compressed.
+    def __init__(self, segment_path, index=None):
+        self.segment_path = segment_path
+        self.storage = storage_path(segment_path)
+        if self.storage is None:
+            raise FileNotFoundError(segment_path)
+        self.compressed = is_compressed(self.storage)
+        self.index = index
+        self._file = open(self.storage, "rb")
+        self._block = None
+        self._whole = None
+
+    def read(self, start, length):
+        if not self.compressed:
+            self._file.seek(start)
+            return self._file.read(length)
+        if not _has_block_table(self.index):
+            if self._whole is None:
+                self._whole = gzip.decompress(self._file.read())
+            return self._whole[start:start + length]
+
+        blocks = self.index.block_offsets
+        first = bisect.bisect_right(blocks, start) - 1
+        last = bisect.bisect_left(blocks, start + length) - 1
+        if self._block is None or self._block[:2] != (first, last):
+            self._block = (first, last, _read_blocks(self._file, self.index, first, last))
+        base = blocks[first]
+        return self._block[2][start - base:start - base + length]
+
+    def close(self):
+        self._file.close()
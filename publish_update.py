@@ -1,11 +1,36 @@
 import os
 import sys
-import zipfile
+import zlib
+import struct
 import hashlib
 import json
+import shutil
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
 
 DIST_DIR = "dist"
 RELEASE_DIR = "release"
+FILES_DIR = "files"
+CACHE_DIR = ".release_cache"
+BASE_URL = "https://raw.githubusercontent.com/saisanthoshmanepalli/LogCaptureTool/main/release"
+EXCLUDED_DIRS = {"__pycache__"}
+COMPRESS_LEVEL = 6
+
+# ---------------- RELEASE BUILD ----------------
+# The zip is written directly rather than through zipfile so members can be
+# reused pre-compressed: .release_cache/<sha256>.deflate holds the raw deflate
+# stream of every file content seen so far, and only new content is compressed
+# (in a process pool). Members are sorted by name and stamped 1980-01-01 with
+# fixed attributes, so the same inputs always give the same archive bytes, and
+# the archive's sha256 is taken while it is written.
+
+Member = namedtuple("Member", "path arcname sha256 size crc32")
+
+DOS_DATE_1980_01_01 = (0 << 9) | (1 << 5) | 1
+DOS_TIME_MIDNIGHT = 0
+ZIP_VERSION = 20
+ZIP_DEFLATED = 8
+ZIP_UTF8_FLAG = 0x800
 
 def sha256sum(filename):
     h = hashlib.sha256()
@@ -14,30 +39,141 @@ def sha256sum(filename):
             h.update(chunk)
     return h.hexdigest()
 
-def make_zip(version):
-    os.makedirs(RELEASE_DIR, exist_ok=True)
-    zip_name = f"LogCaptureTool-{version}.zip"
-    zip_path = os.path.join(RELEASE_DIR, zip_name)
+def dist_files(dist_dir=DIST_DIR):
+    # (path, arcname) for every shipped file, in a stable order
+    for root, dirs, files in os.walk(dist_dir):
+        dirs[:] = sorted(d for d in dirs if d not in EXCLUDED_DIRS)
+        for file in sorted(files):
+            filepath = os.path.join(root, file)
+            yield filepath, os.path.relpath(filepath, dist_dir).replace(os.sep, "/")
+
+def scan_dist(dist_dir=DIST_DIR):
+    # One read per file gives the sha256 (cache key, manifest) and the crc32 (zip).
+    members = []
+    for filepath, arcname in dist_files(dist_dir):
+        h, crc, size = hashlib.sha256(), 0, 0
+        with open(filepath, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(chunk)
+                crc = zlib.crc32(chunk, crc)
+                size += len(chunk)
+        members.append(Member(filepath, arcname, h.hexdigest(), size, crc))
+    return sorted(members, key=lambda m: m.arcname)
+
+def _deflate(src_path, cache_path, level=COMPRESS_LEVEL):
+    with open(src_path, "rb") as f:
+        data = f.read()
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(compressor.compress(data) + compressor.flush())
+    os.replace(tmp_path, cache_path)
+
+def _cache_path(cache_dir, member):
+    return os.path.join(cache_dir, f"{member.sha256}.deflate")
 
-    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zipf:
-        for root, dirs, files in os.walk(DIST_DIR):
-            for file in files:
-                filepath = os.path.join(root, file)
-                arcname = os.path.relpath(filepath, DIST_DIR)
-                zipf.write(filepath, arcname)
+def fill_cache(members, cache_dir=CACHE_DIR, workers=None):
+    # Compresses content not in the cache yet; returns how many files that was.
+    os.makedirs(cache_dir, exist_ok=True)
+    missing = {}
+    for m in members:
+        if not os.path.exists(_cache_path(cache_dir, m)):
+            missing.setdefault(m.sha256, m)
+    missing = list(missing.values())
+    if len(missing) == 1:
+        # Not worth starting worker processes for the usual one-file change.
+        _deflate(missing[0].path, _cache_path(cache_dir, missing[0]))
+    elif missing:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # Largest first so a big DLL doesn't start last.
+            futures = [executor.submit(_deflate, m.path, _cache_path(cache_dir, m))
+                       for m in sorted(missing, key=lambda m: -m.size)]
+            for future in futures:
+                future.result()
+    return len(missing)
 
-    return zip_path
+class _HashingWriter:
+    def __init__(self, f):
+        self._f = f
+        self.sha256 = hashlib.sha256()
+        self.offset = 0
 
-def update_manifest(version, zip_path):
-    sha256 = sha256sum(zip_path)
+    def write(self, data):
+        self._f.write(data)
+        self.sha256.update(data)
+        self.offset += len(data)
+
+def write_zip(members, zip_path, cache_dir=CACHE_DIR):
+    # Returns the archive's sha256. No zip64: releases stay far below 4 GB.
+    central = []
+    tmp_path = zip_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        out = _HashingWriter(f)
+        for m in members:
+            name = m.arcname.encode("utf-8")
+            flags = 0 if name.isascii() else ZIP_UTF8_FLAG
+            compressed_size = os.path.getsize(_cache_path(cache_dir, m))
+            offset = out.offset
+            out.write(struct.pack("<IHHHHHIIIHH", 0x04034b50, ZIP_VERSION, flags, ZIP_DEFLATED,
+                                  DOS_TIME_MIDNIGHT, DOS_DATE_1980_01_01, m.crc32,
+                                  compressed_size, m.size, len(name), 0) + name)
+            with open(_cache_path(cache_dir, m), "rb") as src:
+                for chunk in iter(lambda: src.read(1024 * 1024), b""):
+                    out.write(chunk)
+            central.append(struct.pack("<IHHHHHHIIIHHHHHII", 0x02014b50, ZIP_VERSION, ZIP_VERSION, flags,
+                                       ZIP_DEFLATED, DOS_TIME_MIDNIGHT, DOS_DATE_1980_01_01, m.crc32,
+                                       compressed_size, m.size, len(name), 0, 0, 0, 0, 0, offset) + name)
+        central_offset = out.offset
+        for entry in central:
+            out.write(entry)
+        out.write(struct.pack("<IHHHHIIH", 0x06054b50, 0, 0, len(central), len(central),
+                              out.offset - central_offset, central_offset, 0))
+    os.replace(tmp_path, zip_path)
+    return out.sha256.hexdigest()
+
+def make_zip(version, members, release_dir=RELEASE_DIR, cache_dir=CACHE_DIR):
+    # Returns (zip_path, sha256).
+    os.makedirs(release_dir, exist_ok=True)
+    zip_name = f"LogCaptureTool-{version}.zip"
+    zip_path = os.path.join(release_dir, zip_name)
+    fill_cache(members, cache_dir)
+    return zip_path, write_zip(members, zip_path, cache_dir)
+
+def publish_files(members, release_dir=RELEASE_DIR):
+    # Content-addressed copies under release/files/<sha256>; unchanged files
+    # are already there from an earlier release and cost nothing.
+    files_dir = os.path.join(release_dir, FILES_DIR)
+    os.makedirs(files_dir, exist_ok=True)
+    files = {}
+    for m in members:
+        object_path = os.path.join(files_dir, m.sha256)
+        if not os.path.exists(object_path):
+            shutil.copyfile(m.path, object_path)
+        files[m.arcname] = {"sha256": m.sha256, "size": m.size}
+    return files
+
+def update_manifest(version, zip_path, zip_sha256, files, release_dir=RELEASE_DIR, base_url=BASE_URL):
+    # Format 2 adds the per-file list; "url"/"sha256" keep older clients working.
     manifest = {
+        "format": 2,
         "version": version,
         "notes": "Bug fixes and improvements",
-        "url": f"https://raw.githubusercontent.com/saisanthoshmanepalli/LogCaptureTool/main/release/{os.path.basename(zip_path)}",
-        "sha256": sha256,
+        "url": f"{base_url}/{os.path.basename(zip_path)}",
+        "sha256": zip_sha256,
+        "zip_size": os.path.getsize(zip_path),
+        "files_url": f"{base_url}/{FILES_DIR}",
+        "files": files,
     }
-    with open(os.path.join(RELEASE_DIR, "manifest.json"), "w") as f:
+    with open(os.path.join(release_dir, "manifest.json"), "w") as f:
         json.dump(manifest, f, indent=2)
+    return manifest
+
+def publish(version, dist_dir=DIST_DIR, release_dir=RELEASE_DIR, cache_dir=CACHE_DIR, base_url=BASE_URL):
+    members = scan_dist(dist_dir)
+    zip_path, zip_sha256 = make_zip(version, members, release_dir, cache_dir)
+    files = publish_files(members, release_dir)
+    update_manifest(version, zip_path, zip_sha256, files, release_dir, base_url)
+    return zip_path, zip_sha256
 
 def main():
     if len(sys.argv) < 2:
@@ -45,9 +181,8 @@ def main():
         sys.exit(1)
 
     version = sys.argv[1]
-    zip_path = make_zip(version)
-    update_manifest(version, zip_path)
-    print(f"Published {zip_path} and updated manifest.json")
+    zip_path, zip_sha256 = publish(version)
+    print(f"Published {zip_path} (sha256 {zip_sha256}) and updated manifest.json")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,94 @@
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "dist"))
+
+from capture_engine import CaptureWriter
+
+FAKE_ADB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_adb.py")
+SEQ_RE = re.compile(rb"seq=(\d+)")
+
+
+def run_engine(proc, log_file_base, max_size):
+    writer = CaptureWriter(log_file_base, max_size).start()
+    try:
+        writer.pump(proc.stdout)
+    finally:
+        writer.close()
+    return writer.counter.value
+
+
+def run_legacy(proc, log_file_base, max_size):
+    # The pre-engine loop: text-mode readline, one write and one tell() per line.
+    stream = open(proc.stdout.fileno(), "r", encoding="utf-8", closefd=False)
+    file_index = 1
+    count = 0
+    f = open(f"{log_file_base}_{file_index}.txt", "a", encoding="utf-8")
+    try:
+        while True:
+            line = stream.readline()
+            if not line:
+                break
+            f.write(line)
+            count += 1
+            if f.tell() >= max_size:
+                f.close()
+                file_index += 1
+                f = open(f"{log_file_base}_{file_index}.txt", "a", encoding="utf-8")
+    finally:
+        f.close()
+    return count
+
+
+def verify(log_dir, expected):
+    segments = sorted(
+        (f for f in os.listdir(log_dir) if f.endswith(".txt")),
+        key=lambda name: int(name.rsplit("_", 1)[1][:-4]),
+    )
+    seq = 0
+    for name in segments:
+        with open(os.path.join(log_dir, name), "rb") as f:
+            for match in SEQ_RE.finditer(f.read()):
+                if int(match.group(1)) != seq:
+                    return f"gap at seq={seq} in {name}", len(segments)
+                seq += 1
+    if seq != expected:
+        return f"expected {expected} lines, found {seq}", len(segments)
+    return None, len(segments)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Capture throughput benchmark against fake_adb.py")
+    parser.add_argument("--rate", type=int, default=0, help="lines per second, 0 for unthrottled")
+    parser.add_argument("--lines", type=int, default=500000)
+    parser.add_argument("--max-size", type=int, default=5 * 1024 * 1024)
+    parser.add_argument("--legacy", action="store_true", help="benchmark the old per-line loop instead")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as log_dir:
+        cmd = [sys.executable, FAKE_ADB, "logcat", "--rate", str(args.rate), "--lines", str(args.lines)]
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE)
+        base = os.path.join(log_dir, "log_bench_capture")
+        start = time.perf_counter()
+        counted = (run_legacy if args.legacy else run_engine)(proc, base, args.max_size)
+        elapsed = time.perf_counter() - start
+        proc.wait()
+
+        total_bytes = sum(os.path.getsize(os.path.join(log_dir, f)) for f in os.listdir(log_dir))
+        problem, segments = verify(log_dir, args.lines)
+        mode = "legacy" if args.legacy else "engine"
+        print(f"[{mode}] {counted} lines, {total_bytes / 1e6:.1f} MB, {segments} segments in {elapsed:.2f}s")
+        print(f"[{mode}] {counted / elapsed:,.0f} lines/s, {total_bytes / elapsed / 1e6:.1f} MB/s")
+        if problem:
+            print(f"[{mode}] FAILED: {problem}")
+            sys.exit(1)
+        print(f"[{mode}] OK: no dropped or reordered lines")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import argparse
+import os
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "dist"))
+
+from bench_storage import FEATURE, PLATFORM, TESTER, generate_corpus
+from capture_engine import CaptureWriter
+from logcat_columns import (LEVELS, ColumnBuilder, ColumnQuery, ColumnStage, build_segment_columns,
+                            filter_segments, pack_timestamp)
+from log_index import session_segments
+
+# Same question answered by scanning the text, the way it had to be done before.
+TEXT_QUERY_RE = re.compile(
+    rb"^09-08 (15:4[89]|15:5[0-2]):\d\d\.\d{3}\s+\d+\s+\d+ [WEF] (PowerUI|Watchdog)\s*: .*$",
+    re.MULTILINE)
+QUERY = ColumnQuery(min_level=LEVELS["W"], tags=["PowerUI", "Watchdog"],
+                    start_ts=pack_timestamp(9, 8, 15, 48, 0), end_ts=pack_timestamp(9, 8, 15, 52, 59, 999))
+
+
+def text_query(segments):
+    hits = 0
+    for path in segments:
+        with open(path, "rb") as f:
+            hits += sum(1 for _ in TEXT_QUERY_RE.finditer(f.read()))
+    return hits
+
+
+def replay(paths, log_dir, structured):
+    # Feed the corpus through a CaptureWriter in 256 KB batches, as pump() would.
+    writer = CaptureWriter(os.path.join(log_dir, f"replay_{int(structured)}"), 5 * 1024 * 1024,
+                           stages=[ColumnStage()] if structured else []).start()
+    lines = 0
+    start = time.perf_counter()
+    for path in paths:
+        with open(path, "rb") as f:
+            data = f.read()
+        pos = 0
+        while pos < len(data):
+            cut = data.rfind(b"\n", pos, pos + 256 * 1024) + 1 or len(data)
+            batch = data[pos:cut]
+            n = batch.count(b"\n")
+            writer.submit(batch, n)
+            lines += n
+            pos = cut
+    writer.close()
+    return lines, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Logcat column store benchmark")
+    parser.add_argument("--segments", type=int, default=40, help="number of 5 MB segments")
+    parser.add_argument("--hours", type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as logs_root:
+        paths = generate_corpus(logs_root, args.segments, args.hours)
+        segments = session_segments("20250908", TESTER, FEATURE, PLATFORM, logs_root=logs_root)
+
+        rows, start = 0, time.perf_counter()
+        for path in paths:
+            builder = ColumnBuilder()
+            with open(path, "rb") as f:
+                builder.feed(f.read(), 0)
+            rows += len(builder.columns["ts"])
+        elapsed = time.perf_counter() - start
+        print(f"parse: {rows} lines in {elapsed:.2f}s = {rows / elapsed:,.0f} lines/s")
+
+        with tempfile.TemporaryDirectory() as replay_dir:
+            for structured in (False, True):
+                lines, elapsed = replay(paths, replay_dir, structured)
+                label = "capture + columns" if structured else "capture only"
+                print(f"{label:>18}: {lines / elapsed:,.0f} lines/s")
+
+        for path in paths:
+            build_segment_columns(path)
+
+        start = time.perf_counter()
+        text_hits = text_query(segments)
+        text_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        column_hits = sum(1 for _ in filter_segments(segments, QUERY))
+        column_ms = (time.perf_counter() - start) * 1000
+        print("level>=W, tag in (PowerUI, Watchdog), 15:48-15:52:")
+        print(f"  text regex: {text_hits} hits in {text_ms:.0f} ms")
+        print(f"  columns:    {column_hits} hits in {column_ms:.0f} ms")
+        if text_hits != column_hits:
+            print("MISMATCH between text and column results")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "dist"))
+
+from device_registry import DeviceRegistry
+from fake_adb_server import FakeAdbServer
+
+
+def wait_for(registry, events, kind, serial, timeout=2.0):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        registry.drain()
+        for event in events:
+            if event == (kind, serial):
+                events.remove(event)
+                return time.perf_counter()
+        time.sleep(0.001)
+    raise TimeoutError(f"no {kind} event for {serial}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Device registry latency and idle-CPU check")
+    parser.add_argument("--cycles", type=int, default=50)
+    parser.add_argument("--idle", type=float, default=5.0, help="seconds to measure idle CPU")
+    args = parser.parse_args()
+
+    server = FakeAdbServer().start()
+    registry = DeviceRegistry(adb_port=server.port, start_adb_server=False).start()
+    events = []
+    registry.subscribe(lambda kind, device: events.append((kind, device.serial)))
+
+    latencies = []
+    for i in range(args.cycles):
+        serial = f"FAKE{i % 4:04d}"
+        for kind, action in (("added", server.set_device), ("removed", server.remove_device)):
+            start = time.perf_counter()
+            action(serial)
+            latencies.append((wait_for(registry, events, kind, serial) - start) * 1000)
+
+    latencies.sort()
+    print(f"connect/disconnect events: {len(latencies)}")
+    print(f"latency ms: p50={statistics.median(latencies):.2f} "
+          f"p99={latencies[int(len(latencies) * 0.99) - 1]:.2f} max={latencies[-1]:.2f}")
+
+    server.set_device("FAKE_IDLE", model="Idle_Phone")
+    wait_for(registry, events, "added", "FAKE_IDLE")
+    print(f"cached devices: {registry.devices()}")
+    cpu = time.process_time()
+    time.sleep(args.idle)
+    print(f"idle CPU over {args.idle:.0f}s: {(time.process_time() - cpu) * 1000:.1f} ms")
+
+    registry.stop()
+    server.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TOOLS_DIR, "..", "dist"))
+sys.path.insert(0, os.path.join(TOOLS_DIR, ".."))
+
+import publish_update
+from fake_ota_server import FakeOtaServer
+from ota_update import UpdateProgress, apply_update, fetch_manifest, file_sha256
+
+DIST_DIR = os.path.join(TOOLS_DIR, "..", "dist")
+
+
+def publish(src, release, version, base_url):
+    cache_dir = os.path.join(os.path.dirname(release), "release_cache")
+    zip_path, _ = publish_update.publish(version, src, release, cache_dir, base_url)
+    return zip_path
+
+
+def check_installed(src, install):
+    for path, name in publish_update.dist_files(src):
+        target = os.path.join(install, *name.split("/"))
+        if not os.path.isfile(target) or file_sha256(target) != file_sha256(path):
+            return f"{name} differs from the release"
+    return None
+
+
+def update(server, install, label):
+    server.reset_stats()
+    manifest_url = f"{server.url}/manifest.json"
+    cache_path = os.path.join(install, ".ota_manifest_cache.json")
+    start = time.perf_counter()
+    manifest = fetch_manifest(manifest_url, cache_path)
+    progress = UpdateProgress()
+    apply_update(manifest, install, progress)
+    elapsed = time.perf_counter() - start
+    print(f"{label:>28}: {server.bytes_sent:>11,} bytes over {len(server.requests)} requests in {elapsed:.2f}s")
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Delta OTA update against a local http.server stand-in")
+    parser.add_argument("--dist", default=DIST_DIR, help="tree to publish (default: dist/)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        src, release, install = (os.path.join(root, d) for d in ("src", "release", "install"))
+        shutil.copytree(args.dist, src, ignore=shutil.ignore_patterns("__pycache__"))
+        os.makedirs(install)
+        server = FakeOtaServer(release).start()
+        failures = []
+        try:
+            zip_path = publish(src, release, "1.0.0", server.url)
+            update(server, install, "fresh install (1.0.0)")
+
+            # Typical Python-only release: one module changes (plus an empty
+            # new file, which has nothing to download).
+            with open(os.path.join(src, "log_capture_tool.py"), "a") as f:
+                f.write("\n# release 1.0.1\n")
+            open(os.path.join(src, "__init__.py"), "w").close()
+            zip_path = publish(src, release, "1.0.1", server.url)
+            update(server, install, "one-file release (1.0.1)")
+            print(f"{'full zip (v1 client)':>28}: {os.path.getsize(zip_path):>11,} bytes")
+            failures.append(check_installed(src, install))
+
+            # Unchanged manifest: conditional GET answers 304.
+            server.reset_stats()
+            fetch_manifest(f"{server.url}/manifest.json", os.path.join(install, ".ota_manifest_cache.json"))
+            status = server.requests[-1][1]
+            print(f"{'manifest re-check':>28}: HTTP {status}")
+            if status != 304:
+                failures.append("manifest re-check was not a 304")
+
+            # Dropped connection halfway through the largest changed file.
+            largest, name = max((os.path.getsize(p), p) for p, _ in publish_update.dist_files(src))
+            with open(name, "ab") as f:
+                f.write(b"\0" * 16)
+            publish(src, release, "1.0.2", server.url)
+            digest = file_sha256(name)
+            server.cut_next_response(f"/files/{digest}", largest // 2)
+            update(server, install, "resumed download (1.0.2)")
+            if sum(sent for path, _, sent in server.requests if path.startswith("/files/")) != largest + 16:
+                failures.append("resume re-downloaded bytes it already had")
+            failures.append(check_installed(src, install))
+
+            # An older v1 manifest still installs from the zip.
+            v1_install = os.path.join(root, "install_v1")
+            os.makedirs(v1_install)
+            publish(src, release, "1.0.3", server.url)
+            manifest = fetch_manifest(f"{server.url}/manifest.json", os.path.join(v1_install, "cache.json"))
+            server.reset_stats()
+            apply_update({k: manifest[k] for k in ("version", "notes", "url", "sha256")}, v1_install)
+            print(f"{'v1 manifest (zip)':>28}: {server.bytes_sent:>11,} bytes")
+            failures.append(check_installed(src, v1_install))
+        finally:
+            server.close()
+
+    failures = [f for f in failures if f]
+    for failure in failures:
+        print(f"FAILED {failure}")
+    if not failures:
+        print("OK: installed trees match the published release")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TOOLS_DIR, ".."))
+
+import publish_update
+
+DIST_DIR = os.path.join(TOOLS_DIR, "..", "dist")
+
+
+def legacy_publish(dist_dir, release_dir, version):
+    # The old make_zip + update_manifest: recompress everything, then re-read to hash.
+    os.makedirs(release_dir, exist_ok=True)
+    zip_path = os.path.join(release_dir, f"LogCaptureTool-{version}.zip")
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zipf:
+        for root, dirs, files in os.walk(dist_dir):
+            for file in files:
+                filepath = os.path.join(root, file)
+                zipf.write(filepath, os.path.relpath(filepath, dist_dir))
+    return publish_update.sha256sum(zip_path)
+
+
+def pad_binaries(src, megabytes, seed=1):
+    # dist/ here ships a trimmed ios_tools; pad it to the size of a full one
+    # with half-compressible binary blobs.
+    rng = random.Random(seed)
+    tools_dir = os.path.join(src, "ios_tools")
+    os.makedirs(tools_dir, exist_ok=True)
+    for i in range(megabytes):
+        block = bytes(rng.getrandbits(8) for _ in range(64 * 1024)) + bytes(64 * 1024)
+        with open(os.path.join(tools_dir, f"bench_pad_{i}.dll"), "wb") as f:
+            f.write(block * 8)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def check_zip(zip_path, src):
+    with zipfile.ZipFile(zip_path) as zipf:
+        if zipf.testzip() is not None:
+            return "corrupt member"
+        for path, arcname in publish_update.dist_files(src):
+            with open(path, "rb") as f:
+                if zipf.read(arcname) != f.read():
+                    return f"{arcname} differs"
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Release build benchmark: full rebuild vs build cache")
+    parser.add_argument("--pad-mb", type=int, default=20, help="extra binary payload added to ios_tools")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        src = os.path.join(root, "dist")
+        cache = os.path.join(root, "cache")
+        shutil.copytree(DIST_DIR, src, ignore=shutil.ignore_patterns("__pycache__"))
+        pad_binaries(src, args.pad_mb)
+        size = sum(os.path.getsize(p) for p, _ in publish_update.dist_files(src))
+        print(f"dist: {size / 1e6:.1f} MB")
+
+        _, legacy = timed(legacy_publish, src, os.path.join(root, "legacy"), "1.0.0")
+        print(f"{'legacy full rebuild':>26}: {legacy * 1000:7.0f} ms")
+
+        (_, cold_sha), cold = timed(publish_update.publish, "1.0.0", src, os.path.join(root, "r0"), cache)
+        print(f"{'cold cache':>26}: {cold * 1000:7.0f} ms")
+
+        (_, warm_sha), warm = timed(publish_update.publish, "1.0.0", src, os.path.join(root, "r1"), cache)
+        print(f"{'no change':>26}: {warm * 1000:7.0f} ms")
+
+        times = []
+        for i in range(args.repeat):
+            with open(os.path.join(src, "log_capture_tool.py"), "a") as f:
+                f.write(f"\n# change {i}\n")
+            (zip_path, _), elapsed = timed(publish_update.publish, f"1.0.{i + 1}", src,
+                                           os.path.join(root, f"r{i + 2}"), cache)
+            times.append(elapsed)
+        print(f"{'one-file change':>26}: {sorted(times)[len(times) // 2] * 1000:7.0f} ms (median of {args.repeat})")
+
+        failures = []
+        if cold_sha != warm_sha:
+            failures.append("identical inputs gave different archives")
+        problem = check_zip(zip_path, src)
+        if problem:
+            failures.append(problem)
+        # A fresh cache must produce the very same bytes.
+        _, fresh_sha = publish_update.publish("1.0.x", src, os.path.join(root, "fresh"), os.path.join(root, "cache2"))
+        _, rebuilt_sha = publish_update.publish("1.0.x", src, os.path.join(root, "again"), cache)
+        if fresh_sha != rebuilt_sha:
+            failures.append("cached and uncached builds differ")
+
+    for failure in failures:
+        print(f"FAILED {failure}")
+    if not failures:
+        print("OK: archives are reproducible and match the source tree")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "dist"))
+
+from bench_storage import generate_corpus
+from capture_metrics import MetricsSampler, MetricsServer
+from capture_supervisor import CaptureSupervisor
+from live_matcher import AlertRule, KeywordAlerts, load_hits
+
+KEYWORDS = ["Unity", "GameException", "Exception", "wifi"]
+RULES = [AlertRule("GameException", 5, 10.0, 60.0)]
+
+
+def add_exception_burst(path, count=6):
+    # The sample log has no GameException lines; give the alert rule something to fire on.
+    with open(path, "ab") as f:
+        for i in range(count):
+            f.write(b"09-08 15:59:59.%03d  4242  4300 E Unity   : GameException: NullReferenceException #%d\n" % (i, i))
+
+
+def file_source(paths):
+    # Replays recorded logs at full speed through the same pump() as adb.
+    def source(writer, keep_running):
+        for path in paths:
+            with open(path, "rb") as f:
+                writer.pump(f, keep_running)
+    return source
+
+
+def expected_counts(paths, keywords):
+    counts = dict.fromkeys(keywords, 0)
+    for path in paths:
+        with open(path, "rb") as f:
+            for line in f:
+                low = line.lower()
+                for kw in keywords:
+                    if kw.lower().encode("utf-8") in low:
+                        counts[kw] += 1
+    return counts
+
+
+def hit_lines(log_dir):
+    total = 0
+    for name in os.listdir(log_dir):
+        if name.endswith(".txt"):
+            hits = load_hits(os.path.join(log_dir, name))
+            total += len(hits[1]) if hits else 0
+    return total
+
+
+def run(paths, devices, live, structured):
+    with tempfile.TemporaryDirectory() as logs_root:
+        alerts = KeywordAlerts(KEYWORDS, RULES)
+        supervisor = CaptureSupervisor(5 * 1024 * 1024, stage_factories=[alerts.stage] if live else ())
+        start = time.perf_counter()
+        for i in range(devices):
+            log_dir = os.path.join(logs_root, f"REPLAY{i}")
+            os.makedirs(log_dir)
+            supervisor.start_session("Android", f"REPLAY{i}", os.path.join(log_dir, "log_replay"),
+                                     file_source(paths), structured=structured)
+        while supervisor.is_running("Android"):
+            time.sleep(0.01)
+        elapsed = time.perf_counter() - start
+        lines, written, dropped = supervisor.totals()
+        latency = supervisor.pool.latency.percentiles()
+
+        sampler = MetricsSampler(supervisor, alerts)
+        sampler.sample()
+        server = MetricsServer(sampler.latest, port=0).start()
+        with urllib.request.urlopen(server.url) as resp:
+            scraped = json.load(resp)
+        server.close()
+        hits = sum(hit_lines(os.path.join(logs_root, f"REPLAY{i}")) for i in range(devices)) if live else 0
+
+    label = " + ".join(["capture"] + (["matcher"] if live else []) + (["columns"] if structured else []))
+    print(f"{label:>27}: {lines / elapsed:10,.0f} lines/s {written / elapsed / 1e6:7.1f} MB/s  "
+          f"write latency p50 {latency['p50']:.2f} p95 {latency['p95']:.2f} p99 {latency['p99']:.2f} ms")
+    return lines, dropped, alerts.counts(), list(alerts.recent_alerts), scraped, hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded logcat through capture with live matching")
+    parser.add_argument("files", nargs="*", help="logcat files to replay (default: generated corpus)")
+    parser.add_argument("--segments", type=int, default=8, help="5 MB segments to generate without files")
+    parser.add_argument("--devices", type=int, default=2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as corpus_root:
+        paths = args.files
+        if not paths:
+            paths = generate_corpus(corpus_root, args.segments, 1)
+            add_exception_burst(paths[-1])
+        expected = expected_counts(paths, KEYWORDS)
+        expected_lines = sum(sum(1 for _ in open(p, "rb")) for p in paths) * args.devices
+
+        failures = []
+        for live, structured in ((False, False), (True, False), (True, True)):
+            lines, dropped, counts, fired, scraped, hits = run(paths, args.devices, live, structured)
+            if lines != expected_lines:
+                failures.append(f"captured {lines} lines, expected {expected_lines}")
+            if dropped:
+                failures.append(f"{dropped} lines dropped")
+            if scraped["lines"] != lines:
+                failures.append(f"/metrics reported {scraped['lines']} lines, expected {lines}")
+            if not live:
+                continue
+            want = {kw: n * args.devices for kw, n in expected.items()}
+            if counts != want:
+                failures.append(f"live counts {counts}, expected {want}")
+            if scraped["matches"] != counts:
+                failures.append("/metrics matches differ from the matcher")
+            if want["GameException"] >= RULES[0].count and not fired:
+                failures.append("GameException alert did not fire")
+            print(f"{'':>29}matches {counts}, {hits} hit lines indexed, {len(fired)} alerts")
+
+    for failure in failures:
+        print(f"FAILED {failure}")
+    if not failures:
+        print("OK: live counts match a line-by-line scan and /metrics agrees")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "dist"))
+
+from log_index import KeywordMatcher, build_segment_index, search_segments, session_segments
+
+SAMPLE_LOG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "logs",
+                          "20250908", "santhosh", "15", "mds", "android", "log_santhosh_mds_1.txt")
+SEGMENT_SIZE = 5 * 1024 * 1024
+TESTER, FEATURE, PLATFORM = "bench", "search", "android"
+
+
+def generate_corpus(logs_root, segments, hours, hit_every):
+    with open(SAMPLE_LOG, "rb") as f:
+        sample = [line for line in f.read().splitlines(keepends=True) if line.strip()]
+    hit = b"09-08 15:50:11.201  4242  4301 E Unity   : GameException: bench marker\n"
+    n = 0
+    paths = []
+    for seg in range(segments):
+        hour = f"{seg * hours // segments:02d}"
+        log_dir = os.path.join(logs_root, "20250908", TESTER, hour, FEATURE, PLATFORM)
+        os.makedirs(log_dir, exist_ok=True)
+        index = len(os.listdir(log_dir)) + 1
+        path = os.path.join(log_dir, f"log_{TESTER}_{FEATURE}_{index}.txt")
+        size = 0
+        chunk = []
+        while size < SEGMENT_SIZE:
+            line = hit if hit_every and n % hit_every == 0 else sample[n % len(sample)]
+            chunk.append(line)
+            size += len(line)
+            n += 1
+        with open(path, "wb") as f:
+            f.write(b"".join(chunk))
+        paths.append(path)
+    return paths, n
+
+
+def legacy_search(paths, keywords):
+    # The pre-index loop from view_logs_popup: lower() per keyword per line.
+    count = 0
+    for path in paths:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                if any(kw.lower() in line.lower() for kw in keywords):
+                    count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Indexed vs. full-scan keyword search benchmark")
+    parser.add_argument("--segments", type=int, default=40, help="number of 5 MB segments to generate")
+    parser.add_argument("--hours", type=int, default=8, help="spread segments over this many hour dirs")
+    parser.add_argument("--hit-every", type=int, default=200000, help="one marker line every N lines")
+    parser.add_argument("--keyword", action="append", help="keyword to search (repeatable)")
+    args = parser.parse_args()
+    keywords = args.keyword or ["GameException"]
+
+    with tempfile.TemporaryDirectory() as logs_root:
+        paths, lines = generate_corpus(logs_root, args.segments, args.hours, args.hit_every)
+        print(f"corpus: {len(paths)} segments, {lines} lines, {sum(map(os.path.getsize, paths)) / 1e6:.0f} MB")
+
+        start = time.perf_counter()
+        for path in paths:
+            build_segment_index(path)
+        elapsed = time.perf_counter() - start
+        print(f"index build: {elapsed:.2f}s total, {elapsed / len(paths) * 1000:.0f} ms/segment")
+
+        segments = session_segments("20250908", TESTER, FEATURE, PLATFORM, logs_root=logs_root)
+        matcher = KeywordMatcher(keywords)
+        for label in ("cold", "warm"):
+            start = time.perf_counter()
+            hits = sum(1 for _ in search_segments(segments, matcher))
+            print(f"indexed search ({label}): {hits} hits in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        start = time.perf_counter()
+        hits = legacy_search(paths, keywords)
+        print(f"legacy scan: {hits} hits in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
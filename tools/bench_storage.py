@@ -0,0 +1,110 @@
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "dist"))
+
+from bench_search import SAMPLE_LOG, SEGMENT_SIZE, legacy_search
+from log_index import KeywordMatcher, build_segment_index, search_segments, session_segments
+from segment_compressor import compress_segment
+from segment_store import storage_path
+
+TESTER, FEATURE, PLATFORM = "bench", "storage", "android"
+HEADER_RE = re.compile(rb"^\d\d-\d\d \d\d:\d\d:\d\d\.\d{3}\s+\d+\s+\d+ ")
+
+
+def generate_corpus(logs_root, segments, hours, seed=1):
+    # Sample lines with fresh timestamps and pid/tid values, so the corpus does
+    # not compress better than real logcat just because it repeats.
+    rng = random.Random(seed)
+    with open(SAMPLE_LOG, "rb") as f:
+        sample = [HEADER_RE.sub(b"", line) for line in f.read().splitlines(keepends=True) if line.strip()]
+    millis = 0
+    paths = []
+    for seg in range(segments):
+        log_dir = os.path.join(logs_root, "20250908", TESTER, f"{seg * hours // segments:02d}", FEATURE, PLATFORM)
+        os.makedirs(log_dir, exist_ok=True)
+        path = os.path.join(log_dir, f"log_{TESTER}_{FEATURE}_{len(os.listdir(log_dir)) + 1}.txt")
+        chunk, size = [], 0
+        while size < SEGMENT_SIZE:
+            millis += rng.randint(0, 40)
+            s, ms = divmod(millis, 1000)
+            header = b"09-08 %02d:%02d:%02d.%03d %5d %5d " % (
+                15 + s // 3600 % 9, s // 60 % 60, s % 60, ms, rng.choice((1734, 2210, 4242, 987)), rng.randint(900, 9000))
+            line = header + rng.choice(sample)
+            chunk.append(line)
+            size += len(line)
+        with open(path, "wb") as f:
+            f.write(b"".join(chunk))
+        paths.append(path)
+    return paths
+
+
+def disk_usage(paths):
+    return sum(os.path.getsize(storage_path(p)) for p in paths)
+
+
+def time_search(segments, keywords, repeat=3):
+    matcher = KeywordMatcher(keywords)
+    best, hits = None, 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        hits = sum(1 for _ in search_segments(segments, matcher))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return hits, best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compressed vs plain segment storage benchmark")
+    parser.add_argument("--segments", type=int, default=400, help="number of 5 MB segments (400 = 2 GB)")
+    parser.add_argument("--hours", type=int, default=8)
+    parser.add_argument("--keyword", action="append", help="keyword set to time (repeatable)")
+    args = parser.parse_args()
+    keyword_sets = [[kw] for kw in args.keyword] if args.keyword else [["GameException"], ["wifi"]]
+
+    with tempfile.TemporaryDirectory() as logs_root:
+        paths = generate_corpus(logs_root, args.segments, args.hours)
+        segments = session_segments("20250908", TESTER, FEATURE, PLATFORM, logs_root=logs_root)
+        plain_bytes = disk_usage(segments)
+        print(f"corpus: {len(segments)} segments, {plain_bytes / 1e6:.0f} MB plain text")
+
+        start = time.perf_counter()
+        for path in paths:
+            build_segment_index(path)
+        print(f"index build: {(time.perf_counter() - start) / len(paths) * 1000:.0f} ms/segment")
+
+        plain = {tuple(kws): time_search(segments, kws) for kws in keyword_sets}
+        legacy = {}
+        for kws in keyword_sets:
+            start = time.perf_counter()
+            legacy[tuple(kws)] = (legacy_search(paths, kws), (time.perf_counter() - start) * 1000)
+
+        costs = []
+        for path in paths:
+            start = time.perf_counter()
+            compress_segment(path)
+            costs.append(time.perf_counter() - start)
+        compressed_bytes = disk_usage(segments)
+        index_bytes = sum(os.path.getsize(p + ".idx") for p in paths)
+        print(f"compressed: {compressed_bytes / 1e6:.1f} MB (+{index_bytes / 1e6:.1f} MB indexes), "
+              f"ratio {plain_bytes / compressed_bytes:.1f}x")
+        costs.sort()
+        print(f"compression cost: {sum(costs) / len(costs) * 1000:.0f} ms/segment avg, "
+              f"{costs[-1] * 1000:.0f} ms max, {plain_bytes / sum(costs) / 1e6:.0f} MB/s")
+
+        print(f"{'keywords':<24}{'hits':>10}{'legacy scan':>16}{'indexed plain':>16}{'indexed gzip':>16}")
+        for kws in keyword_sets:
+            hits, gz_ms = time_search(segments, kws)
+            _, plain_ms = plain[tuple(kws)]
+            legacy_hits, legacy_ms = legacy[tuple(kws)]
+            assert hits == plain[tuple(kws)][0] == legacy_hits, "compressed search disagrees with plain text"
+            print(f"{','.join(kws):<24}{hits:>10}{legacy_ms:>13.1f} ms{plain_ms:>13.1f} ms{gz_ms:>13.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "dist"))
+
+from bench_capture import verify
+from capture_supervisor import CaptureSupervisor, capture_process, safe_dir_name
+
+FAKE_ADB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_adb.py")
+
+
+def fake_logcat(serial, rate, lines):
+    command = [sys.executable, FAKE_ADB, "-s", serial, "logcat", "--rate", str(rate), "--lines", str(lines)]
+    return lambda writer, keep_running: capture_process(command, writer, keep_running)
+
+
+def crashing_source(writer, keep_running):
+    writer.submit(b"about to fail\n", 1)
+    raise RuntimeError("simulated session crash")
+
+
+def run(devices, rate, lines, max_size, workers, crash, structured=False):
+    with tempfile.TemporaryDirectory() as logs_root:
+        supervisor = CaptureSupervisor(max_size, writer_workers=workers)
+        serials = [f"FAKE{i:04d}" for i in range(devices)]
+        start = time.perf_counter()
+        for serial in serials:
+            log_dir = os.path.join(logs_root, safe_dir_name(serial))
+            os.makedirs(log_dir)
+            supervisor.start_session("Android", serial, os.path.join(log_dir, "log_bench_multi"),
+                                     fake_logcat(serial, rate, lines), structured=structured)
+        if crash:
+            crash_dir = os.path.join(logs_root, "CRASH")
+            os.makedirs(crash_dir)
+            supervisor.start_session("Android", "CRASH", os.path.join(crash_dir, "log_bench_multi"),
+                                     crashing_source)
+
+        peak = {}
+        while supervisor.is_running("Android"):
+            time.sleep(0.5)
+            for (_, serial), rate_now in supervisor.sample_rates().items():
+                peak[serial] = max(peak.get(serial, 0.0), rate_now)
+        elapsed = time.perf_counter() - start
+
+        failures = []
+        for serial in serials:
+            problem, _ = verify(os.path.join(logs_root, serial), lines)
+            if problem:
+                failures.append(f"{serial}: {problem}")
+        total = supervisor.lines("Android") - (1 if crash else 0)
+        print(f"{devices:3d} devices, {workers} writer workers: {total / elapsed:12,.0f} lines/s aggregate, "
+              f"{total / elapsed / devices:10,.0f} lines/s per device, {elapsed:.2f}s")
+        for serial in serials:
+            print(f"    {serial}: peak {peak.get(serial, 0.0):,.0f} lines/s")
+        for failure in failures:
+            print(f"    FAILED {failure}")
+        return not failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-device capture scaling against fake_adb.py")
+    parser.add_argument("--devices", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--rate", type=int, default=5000, help="lines per second per device, 0 unthrottled")
+    parser.add_argument("--lines", type=int, default=20000, help="lines per device")
+    parser.add_argument("--max-size", type=int, default=1024 * 1024)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--crash", action="store_true", help="add a session that fails immediately")
+    parser.add_argument("--structured", action="store_true", help="parse logcat into column files while capturing")
+    args = parser.parse_args()
+
+    ok = all(run(n, args.rate, args.lines, args.max_size, args.workers, args.crash, args.structured)
+             for n in args.devices)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
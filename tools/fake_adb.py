@@ -0,0 +1,69 @@
+import argparse
+import sys
+import time
+
+# Stand-in for `adb` that emits threadtime logcat at a configurable rate.
+# Every message carries "seq=<n>" so a consumer can check nothing was dropped.
+
+TAGS = [
+    ("D", "SemNscXgbL2Nrt", "L2 NRT 1 sample inference time: 1.432657 msecs"),
+    ("V", "serviceDiscovery", "[MdnsAdvertiser.wlan0] VERBOSE Parsed packet with transactionId(0): 0 questions, 4 answers"),
+    ("I", "SemWifiLinkQualityMonitor", "Link Qos query: inf. ms / 0 Mbps"),
+    ("W", "ActivityManager", "Slow operation: 112ms so far, now at startProcess: done updating pids map"),
+    ("E", "Unity", "GameException: NullReferenceException: Object reference not set to an instance of an object"),
+]
+
+TICK = 0.01
+
+
+def format_line(seq, now):
+    level, tag, msg = TAGS[seq % len(TAGS)]
+    stamp = time.strftime("%m-%d %H:%M:%S", time.localtime(now))
+    millis = int(now * 1000) % 1000
+    return f"{stamp}.{millis:03d}  1734  {2900 + seq % 97:4d} {level} {tag}: {msg} seq={seq}\n"
+
+
+def emit_logcat(rate, total):
+    out = sys.stdout.buffer
+    seq = 0
+    start = time.monotonic()
+    while total == 0 or seq < total:
+        if rate:
+            due = int((time.monotonic() - start) * rate) + 1
+        else:
+            due = seq + 1000
+        if total:
+            due = min(due, total)
+        if due > seq:
+            now = time.time()
+            out.write("".join(format_line(n, now) for n in range(seq, due)).encode("utf-8"))
+            out.flush()
+            seq = due
+        elif rate:
+            time.sleep(TICK)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake adb emitting synthetic logcat output")
+    parser.add_argument("-s", dest="serial", default="FAKE0001", help="device serial")
+    parser.add_argument("command", choices=["logcat", "devices"])
+    parser.add_argument("-c", dest="clear", action="store_true", help="clear the (fake) log buffer and exit")
+    parser.add_argument("-v", dest="format", default="threadtime", choices=["threadtime"], help="output format")
+    parser.add_argument("--rate", type=int, default=10000, help="lines per second, 0 for unthrottled")
+    parser.add_argument("--lines", type=int, default=0, help="stop after this many lines, 0 for forever")
+    args = parser.parse_args()
+
+    if args.command == "devices":
+        print("List of devices attached")
+        print(f"{args.serial}\tdevice")
+        return
+    if args.clear:
+        return
+    try:
+        emit_logcat(args.rate, args.lines)
+    except (BrokenPipeError, KeyboardInterrupt):
+        pass
+
+
+if __name__ == "__main__":
+    main()
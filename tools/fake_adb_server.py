@@ -0,0 +1,117 @@
+import argparse
+import socket
+import threading
+import time
+
+# Stand-in for the adb server's device-tracking side on localhost:5037.
+# Understands host:track-devices(-l), host:devices(-l) and host:version.
+
+
+class FakeAdbServer:
+    def __init__(self, host="127.0.0.1", port=0):
+        self._server = socket.create_server((host, port))
+        self.port = self._server.getsockname()[1]
+        self._devices = {}
+        self._trackers = []
+        self._lock = threading.Lock()
+        self._transport_id = 0
+
+    def start(self):
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        return self
+
+    def close(self):
+        self._server.close()
+        with self._lock:
+            for conn, _ in self._trackers:
+                conn.close()
+            self._trackers.clear()
+
+    def set_device(self, serial, state="device", model="Fake_Phone"):
+        with self._lock:
+            self._transport_id += 1
+            self._devices[serial] = (state, model, self._transport_id)
+            self._broadcast()
+
+    def remove_device(self, serial):
+        with self._lock:
+            self._devices.pop(serial, None)
+            self._broadcast()
+
+    def _payload(self, long_format):
+        lines = []
+        for serial, (state, model, transport_id) in self._devices.items():
+            if long_format:
+                lines.append(f"{serial:<22} {state} product:fake model:{model} device:fake transport_id:{transport_id}\n")
+            else:
+                lines.append(f"{serial}\t{state}\n")
+        return "".join(lines).encode("utf-8")
+
+    @staticmethod
+    def _message(payload):
+        return b"%04x%s" % (len(payload), payload)
+
+    def _broadcast(self):
+        alive = []
+        for conn, long_format in self._trackers:
+            try:
+                conn.sendall(self._message(self._payload(long_format)))
+                alive.append((conn, long_format))
+            except OSError:
+                conn.close()
+        self._trackers = alive
+
+    def _accept_loop(self):
+        while True:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn):
+        try:
+            length = int(conn.recv(4), 16)
+            request = conn.recv(length)
+        except (OSError, ValueError):
+            conn.close()
+            return
+        if request in (b"host:track-devices", b"host:track-devices-l"):
+            long_format = request.endswith(b"-l")
+            with self._lock:
+                conn.sendall(b"OKAY" + self._message(self._payload(long_format)))
+                self._trackers.append((conn, long_format))
+            return
+        if request in (b"host:devices", b"host:devices-l"):
+            with self._lock:
+                conn.sendall(b"OKAY" + self._message(self._payload(request.endswith(b"-l"))))
+        elif request == b"host:version":
+            conn.sendall(b"OKAY" + self._message(b"0029"))
+        else:
+            conn.sendall(b"FAIL" + self._message(b"unknown host service"))
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake adb server that toggles a device on a timer")
+    parser.add_argument("--port", type=int, default=5037)
+    parser.add_argument("--serial", default="FAKE0001")
+    parser.add_argument("--interval", type=float, default=10.0, help="seconds between connect/disconnect")
+    args = parser.parse_args()
+
+    server = FakeAdbServer(port=args.port).start()
+    print(f"Fake adb server listening on 127.0.0.1:{server.port}")
+    try:
+        while True:
+            server.set_device(args.serial)
+            print(f"{args.serial} connected")
+            time.sleep(args.interval)
+            server.remove_device(args.serial)
+            print(f"{args.serial} disconnected")
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import argparse
+import hashlib
+import os
+import re
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+# Stand-in for the release host: http.server serving a release directory with
+# the two things the updater relies on and SimpleHTTPRequestHandler lacks,
+# ETag/If-None-Match and single Range requests. It can also cut the first
+# response for a path short to exercise resume.
+
+RANGE_RE = re.compile(r"bytes=(\d+)-(\d*)$")
+
+
+class _Handler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def _serve(self, send_body):
+        path = self.translate_path(self.path)
+        if not os.path.isfile(path):
+            self.send_error(404)
+            return
+        with open(path, "rb") as f:
+            data = f.read()
+        etag = '"%s"' % hashlib.sha256(data).hexdigest()[:32]
+        if self.headers.get("If-None-Match") == etag:
+            self.server.record(self.path, 304, 0)
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        start, end, status = 0, len(data), 200
+        m = RANGE_RE.match(self.headers.get("Range", ""))
+        if m:
+            start = int(m.group(1))
+            end = int(m.group(2)) + 1 if m.group(2) else len(data)
+            status = 206
+        self.send_response(status)
+        self.send_header("Content-Length", str(end - start))
+        self.send_header("ETag", etag)
+        self.send_header("Accept-Ranges", "bytes")
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end - 1}/{len(data)}")
+        self.end_headers()
+        if not send_body:
+            return
+        body = data[start:end]
+        cut = self.server.take_cut(self.path)
+        if cut is not None and cut < len(body):
+            body = body[:cut]
+            self.close_connection = True
+        self.server.record(self.path, status, len(body))
+        self.wfile.write(body)
+
+
+class FakeOtaServer:
+    def __init__(self, directory, host="127.0.0.1", port=0):
+        self._httpd = ThreadingHTTPServer((host, port), partial(_Handler, directory=directory))
+        self._httpd.record = self._record
+        self._httpd.take_cut = self._take_cut
+        self.port = self._httpd.server_address[1]
+        self.url = f"http://{host}:{self.port}"
+        self.requests = []
+        self.bytes_sent = 0
+        self._cuts = {}
+        self._lock = threading.Lock()
+
+    def start(self):
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def close(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def cut_next_response(self, path, after_bytes):
+        with self._lock:
+            self._cuts[path] = after_bytes
+
+    def reset_stats(self):
+        with self._lock:
+            self.requests = []
+            self.bytes_sent = 0
+
+    def _take_cut(self, path):
+        with self._lock:
+            return self._cuts.pop(path, None)
+
+    def _record(self, path, status, sent):
+        with self._lock:
+            self.requests.append((path, status, sent))
+            self.bytes_sent += sent
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a release directory for OTA testing")
+    parser.add_argument("directory", nargs="?", default="release")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+    server = FakeOtaServer(os.path.abspath(args.directory), port=args.port).start()
+    print(f"Serving {args.directory} on {server.url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()